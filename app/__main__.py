@@ -0,0 +1,137 @@
+# app/__main__.py
+"""
+Punto de entrada de producción.
+
+Uso:
+    python -m app init-db                       # aplica las migraciones (alembic upgrade head)
+    python -m app serve --workers 4             # uvicorn con N procesos, uvloop y httptools
+    python -m app serve --gunicorn              # gunicorn + UvicornWorker (gunicorn.conf.py)
+    python -m app startup-report --budget-ms 500  # tiempo de importación de la app (-X importtime)
+    python -m app init-shards                   # crea items/owner_versions en cada SHARD_URLS
+    python -m app rebalance --owner 42 --to 1   # mueve los items de un usuario a otro shard
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def init_db(revision: str = "head") -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(ROOT / "alembic.ini")), revision)
+
+def serve(args) -> None:
+    if args.gunicorn:
+        # gunicorn lee workers/bind de gunicorn.conf.py (WEB_CONCURRENCY, BIND)
+        os.environ.setdefault("WEB_CONCURRENCY", str(args.workers))
+        os.environ.setdefault("BIND", f"{args.host}:{args.port}")
+        os.execvp("gunicorn", ["gunicorn", "-c", str(ROOT / "gunicorn.conf.py"), "app.main:app"])
+
+    if args.workers > 1:
+        # Cada worker escribe sus métricas aquí y /metrics las agrega (ver gunicorn.conf.py)
+        metrics_dir = os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "app-prometheus")
+        )
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        access_log=args.access_log,
+        proxy_headers=True,
+        log_level=args.log_level,
+    )
+
+def startup_report(args) -> int:
+    import json
+
+    from app import importtime
+
+    data = importtime.report(importtime.measure(), top=args.top)
+    print(json.dumps(data, indent=2) if args.json else importtime.format_report(data))
+    if args.budget_ms and data["total_ms"] > args.budget_ms:
+        print(f"Supera el presupuesto de {args.budget_ms:g} ms", file=sys.stderr)
+        return 1
+    return 0
+
+def init_shards() -> None:
+    from sqlalchemy import create_engine
+
+    from app import sharding
+
+    for index, url in enumerate(sharding.SHARD_URLS):
+        engine = create_engine(url)
+        try:
+            created = sharding.init_shard_schema(engine)
+        finally:
+            engine.dispose()
+        print(f"shard {index}: {', '.join(created) or 'sin cambios'}")
+
+def rebalance(args) -> None:
+    from app import sharding
+
+    moved = sharding.rebalance(args.owner, args.to, wait=args.wait)
+    print(f"{moved} items del usuario {args.owner} en el shard {args.to}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("init-db", help="crear/actualizar el esquema")
+    migrate.add_argument("--revision", default="head")
+
+    run = commands.add_parser("serve", help="arrancar el servidor")
+    run.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    run.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    run.add_argument("--workers", type=int,
+                     default=int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count()))))
+    run.add_argument("--gunicorn", action="store_true", help="usar gunicorn con preload (Linux)")
+    run.add_argument("--access-log", action="store_true", help="registrar cada petición")
+    run.add_argument("--log-level", default="info")
+
+    startup = commands.add_parser("startup-report", help="tiempo de importación de la app")
+    startup.add_argument("--top", type=int, default=15, help="imports más lentos a mostrar")
+    startup.add_argument("--budget-ms", type=float, default=0, help="sale con 1 si se supera")
+    startup.add_argument("--json", action="store_true")
+
+    commands.add_parser("init-shards", help="crear las tablas de items en cada shard")
+
+    move = commands.add_parser("rebalance", help="mover los items de un usuario a otro shard")
+    move.add_argument("--owner", type=int, required=True)
+    move.add_argument("--to", type=int, required=True, help="índice del shard destino en SHARD_URLS")
+    move.add_argument("--wait", type=float, default=None,
+                      help="segundos a esperar tras bloquear al usuario (defecto: SHARD_DIRECTORY_TTL_SECONDS)")
+
+    args = parser.parse_args(argv)
+    if args.command == "init-db":
+        init_db(args.revision)
+    elif args.command == "init-shards":
+        init_shards()
+    elif args.command == "rebalance":
+        rebalance(args)
+    elif args.command == "startup-report":
+        return startup_report(args)
+    else:
+        serve(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,31 @@
 # auth.py - CON BCRYPT DIRECTO
-from jose import JWTError, jwt
+# python-jose (con cryptography) y bcrypt se importan en el primer uso, no al importar la app.
 from datetime import datetime, timedelta
-import os
+import time
+import asyncio
 import hashlib
-import bcrypt
-from dotenv import load_dotenv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import cache, metrics
+from .config import settings
 
-load_dotenv()
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+# Caché de claims ya verificados, indexada por hash del token
+token_cache = cache.Cache(
+    "jwt",
+    ttl=settings.token_cache_max_ttl_seconds,
+    max_entries=settings.token_cache_max_entries,
+)
+
+def __getattr__(name: str):
+    # `auth.JWTError` / `auth.jwt` sin cargar jose hasta que alguien los necesita
+    if name in ("JWTError", "jwt"):
+        import jose.jwt
+        return getattr(jose, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def hash_password(password: str) -> str:
     """
@@ -19,7 +34,10 @@ def hash_password(password: str) -> str:
     # Pre-hashear con SHA-256
     password_sha = hashlib.sha256(password.encode('utf-8')).hexdigest()
     # Aplicar bcrypt
+    import bcrypt
+    start = time.perf_counter()
     hashed = bcrypt.hashpw(password_sha.encode('utf-8'), bcrypt.gensalt())
+    metrics.PASSWORD_HASH_LATENCY.labels(operation="hash").observe(time.perf_counter() - start)
     return hashed.decode('utf-8')  # Guardar como string en la BD
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -28,13 +46,143 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     # Aplicar el mismo pre-hash
     password_sha = hashlib.sha256(plain_password.encode('utf-8')).hexdigest()
-    return bcrypt.checkpw(password_sha.encode('utf-8'), hashed_password.encode('utf-8'))
+    import bcrypt
+    start = time.perf_counter()
+    try:
+        return bcrypt.checkpw(password_sha.encode('utf-8'), hashed_password.encode('utf-8'))
+    finally:
+        metrics.PASSWORD_HASH_LATENCY.labels(operation="verify").observe(time.perf_counter() - start)
+
+# ----------------------------
+# Pool dedicado para bcrypt
+# ----------------------------
+class HashingPoolSaturated(Exception):
+    """
+    El pool de hashing tiene todas sus plazas (en ejecución + en cola) ocupadas.
+    """
+
+class PasswordHashingPool:
+    """
+    Ejecuta bcrypt en un ThreadPoolExecutor propio (bcrypt libera el GIL),
+    separado del threadpool de FastAPI para que una ráfaga de logins no deje
+    sin hilos al resto de endpoints. Como máximo acepta workers + max_pending
+    trabajos a la vez; el resto se rechaza con HashingPoolSaturated.
+    """
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def start(self) -> None:
+        """
+        Crea los hilos de bcrypt por adelantado (arranque de la app).
+        """
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - start
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingPoolSaturated()
+        with self._lock:
+            self.in_flight += 1
+        future = self.executor.submit(self._timed, fn, *args)
+        # La plaza se libera cuando termina el trabajo, aunque el cliente se desconecte antes
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": self.busy_seconds / self.completed if self.completed else 0.0,
+        }
+
+hashing_pool = PasswordHashingPool(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password ejecutado en el pool de hashing.
+    """
+    return await hashing_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password ejecutado en el pool de hashing.
+    """
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
 
 def create_access_token(data: dict) -> str:
     """
     Crea un JWT con expiración definida.
     """
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_token(token: str) -> dict:
+    """
+    Verifica el JWT y retorna sus claims.
+    Los tokens ya verificados se sirven desde token_cache hasta su propio exp
+    (acotado por el TTL de la caché), sin repetir la firma ni el parseo.
+    Retorna siempre una copia: la entrada cacheada se comparte entre peticiones.
+    Lanza JWTError si el token no es válido.
+    """
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return dict(claims)
+
+    from jose import jwt
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    ttl = token_cache.ttl
+    if "exp" in claims:
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, dict(claims), ttl)
+    return claims
@@ -0,0 +1,144 @@
+# app/cache.py
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# ----------------------------
+# Backends
+# ----------------------------
+class CacheBackend(ABC):
+    """
+    Interfaz mínima de almacenamiento para Cache.
+    Un backend compartido (Redis, memcached...) solo tiene que implementar estos métodos;
+    los valores que guarda Cache son siempre tipos JSON (dict, list, str, números).
+    """
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def __len__(self) -> int:
+        return 0
+
+class MemoryBackend(CacheBackend):
+    """
+    LRU en memoria del proceso, acotado en número de entradas y con expiración por entrada.
+    Con `max_bytes` también se acota el tamaño total, medido con `weigh(valor)`.
+    """
+    def __init__(self, max_entries: int, max_bytes: int = 0, weigh: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.weigh = weigh
+        self.bytes = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value: Any) -> int:
+        return self.weigh(value) if self.max_bytes > 0 and self.weigh is not None else 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def _evict(self) -> None:
+        while self._data and (len(self._data) > self.max_entries or (self.max_bytes > 0 and self.bytes > self.max_bytes)):
+            _, (_, _, size) = self._data.popitem(last=False)
+            self.bytes -= size
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        size = self._size(value)
+        if self.max_bytes > 0 and size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (value, time.monotonic() + ttl, size)
+            self.bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+# ----------------------------
+# Cache con contadores
+# ----------------------------
+class Cache:
+    """
+    Caché con nombre, TTL por defecto y contadores de aciertos/fallos.
+    El backend se puede sustituir en caliente con set_backend().
+    """
+    def __init__(self, name: str, ttl: float, max_entries: int, backend: Optional[CacheBackend] = None):
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend or MemoryBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.name}:{key}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.backend.get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(self._key(key), value, self.ttl if ttl is None else ttl)
+
+    def delete(self, key: Hashable) -> None:
+        self.backend.delete(self._key(key))
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.backend),
+            "ttl": self.ttl,
+        }
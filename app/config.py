@@ -0,0 +1,101 @@
+# app/config.py
+# Configuración tipada, leída una sola vez del entorno (y de .env) al importar.
+# Cada campo se lee de la variable de entorno con su nombre en mayúsculas
+# (db_pool_size -> DB_POOL_SIZE); los módulos copian lo que necesitan a sus constantes.
+import os
+from functools import lru_cache
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+def _default_hash_workers() -> int:
+    return min(4, os.cpu_count() or 1)
+
+class Settings(BaseModel):
+    # Base de datos
+    database_url: Optional[str] = None
+    db_async: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = True
+    db_pgbouncer: bool = False
+    # Réplicas de lectura, separadas por comas
+    database_replica_urls: str = ""
+    db_replica_strategy: str = "round_robin"
+    db_replica_max_lag_seconds: float = 5
+    db_replica_check_seconds: float = 1
+    # Shards de items, separados por comas (ver app/sharding.py)
+    shard_urls: str = ""
+    shard_strategy: str = "hash"
+    shard_ranges: str = ""
+    shard_directory_ttl_seconds: float = 60
+    shard_id_block_size: int = 1000
+
+    # Autenticación
+    secret_key: Optional[str] = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    token_cache_max_ttl_seconds: float = 300
+    token_cache_max_entries: int = 50000
+    user_cache_ttl_seconds: float = 60
+    user_cache_max_entries: int = 10000
+    password_hash_workers: int = Field(default_factory=_default_hash_workers)
+    password_hash_max_pending: int = 64
+
+    # Lecturas de items
+    response_cache_ttl_seconds: float = 300
+    response_cache_max_entries: int = 10000
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_max_body_bytes: int = 1024 * 1024
+    fast_json: bool = False
+
+    # Escritura agrupada de POST /items/
+    ingest_batching: bool = False
+    ingest_batch_max_rows: int = 500
+    ingest_batch_max_wait_ms: float = 5
+    ingest_queue_size: int = 10000
+
+    # Observabilidad
+    metrics_enabled: bool = True
+    profiling_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+    profile_explain_ms: float = 50
+    profile_max_kept: int = 50
+    profile_debug_token: str = ""
+    slow_query_log_ms: float = 0
+
+    # Admisión
+    rate_limit_enabled: bool = True
+    rate_limit_max_keys: int = 100000
+    max_concurrent_requests: int = 0
+    # RATE_LIMIT_<PRESUPUESTO>=20/s -> {"search": "20/s"}
+    rate_limits: Dict[str, str] = {}
+
+    # Arranque
+    warmup_enabled: bool = True
+
+    @classmethod
+    def from_env(cls, environ=None) -> "Settings":
+        environ = os.environ if environ is None else environ
+        values = {
+            name: environ[name.upper()]
+            for name in cls.model_fields
+            if name.upper() in environ
+        }
+        values["rate_limits"] = {
+            key[len("RATE_LIMIT_"):].lower(): value
+            for key, value in environ.items()
+            if key.startswith("RATE_LIMIT_") and key.lower() not in cls.model_fields
+        }
+        return cls(**values)
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    load_dotenv()
+    return Settings.from_env()
+
+settings = get_settings()
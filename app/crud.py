@@ -0,0 +1,490 @@
+# app/crud.py
+# Acceso a datos. Todas las funciones reciben una Session síncrona como primer
+# argumento; los endpoints las ejecutan con `await db.run(crud.funcion, ...)`.
+from sqlalchemy import Integer, bindparam, case, cast, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from . import schemas, models, pagination, search
+
+# Órdenes soportados por la paginación por cursor (siempre terminan en id para desempatar).
+# Cada uno recorre un índice (owner_id, columna[, id]); "-" es descendente.
+SORTS = {
+    "id": [(models.Item.id, False)],
+    "-id": [(models.Item.id, True)],
+    "precio": [(models.Item.precio, False), (models.Item.id, False)],
+    "-precio": [(models.Item.precio, True), (models.Item.id, True)],
+    "nombre": [(models.Item.nombre, False), (models.Item.id, False)],
+    "-nombre": [(models.Item.nombre, True), (models.Item.id, True)],
+}
+
+# Operaciones masivas: filas por sentencia
+BULK_CHUNK_SIZE = 500
+
+# Columnas de ItemResponse, en el mismo orden, para los listados en modo tuplas
+ITEM_FIELDS = tuple(schemas.ItemResponse.model_fields)
+ITEM_COLUMNS = [getattr(models.Item, name) for name in ITEM_FIELDS]
+
+# ----------------------------
+# Usuarios
+# ----------------------------
+def get_user(db: Session, user_id: int) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def create_user(db: Session, email: str, hashed_password: str) -> models.User:
+    db_user = models.User(email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+# ----------------------------
+# Contador de cambios por usuario
+# ----------------------------
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def get_owner_version(db: Session, owner_id: int) -> int:
+    version = db.scalar(
+        select(models.OwnerVersion.version).where(models.OwnerVersion.owner_id == owner_id)
+    )
+    return version or 0
+
+def touch_owner(db: Session, owner_id: int) -> None:
+    """
+    Incrementa el contador de cambios del usuario dentro de la transacción en curso.
+    Debe llamarse antes del commit de toda escritura de items.
+    """
+    upsert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        db.execute(
+            upsert(models.OwnerVersion)
+            .values(owner_id=owner_id, version=1)
+            .on_conflict_do_update(
+                index_elements=[models.OwnerVersion.owner_id],
+                set_={"version": models.OwnerVersion.version + 1}
+            )
+        )
+        return
+
+    updated = db.execute(
+        update(models.OwnerVersion)
+        .where(models.OwnerVersion.owner_id == owner_id)
+        .values(version=models.OwnerVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.add(models.OwnerVersion(owner_id=owner_id, version=1))
+
+# ----------------------------
+# Items
+# ----------------------------
+def _owned_item(db: Session, owner_id: int, item_id: int) -> Optional[models.Item]:
+    return db.query(models.Item).filter(
+        models.Item.id == item_id,
+        models.Item.owner_id == owner_id
+    ).first()
+
+def _assign_item_ids(db: Session, rows: List[dict]) -> None:
+    """
+    Con sharding los ids no los genera cada BD sino un contador global
+    (sharding.IdAllocator, instalado en session.info); sin él no se toca nada.
+    """
+    allocate = db.info.get("allocate_item_ids")
+    if allocate is not None:
+        for row, item_id in zip(rows, allocate(len(rows))):
+            row["id"] = item_id
+
+def create_item(db: Session, owner_id: int, item: schemas.ItemCreate) -> models.Item:
+    values = item.dict()
+    _assign_item_ids(db, [values])
+    db_item = models.Item(**values, owner_id=owner_id)
+    db.add(db_item)
+    touch_owner(db, owner_id)
+    db.commit()
+    db.refresh(db_item)
+    return db_item
+
+def get_item(db: Session, owner_id: int, item_id: int) -> Optional[models.Item]:
+    return _owned_item(db, owner_id, item_id)
+
+def get_item_version(db: Session, owner_id: int, item_id: int) -> Optional[int]:
+    """
+    Solo la versión del item (para If-None-Match), sin cargar la fila en el ORM.
+    """
+    return db.scalar(
+        select(models.Item.version).where(
+            models.Item.id == item_id,
+            models.Item.owner_id == owner_id
+        )
+    )
+
+class VersionConflict(Exception):
+    """
+    El item existe pero su versión no coincide con la de If-Match.
+    """
+
+def _item_conditions(owner_id: int, item_id: int, versions: Optional[List[int]]) -> list:
+    conditions = [models.Item.id == item_id, models.Item.owner_id == owner_id]
+    if versions is not None:
+        conditions.append(models.Item.version.in_(versions))
+    return conditions
+
+def _missing_or_conflict(db: Session, owner_id: int, item_id: int, versions: Optional[List[int]]) -> None:
+    """
+    Solo cuando la escritura no afectó ninguna fila: distingue 404 de 412.
+    """
+    db.rollback()
+    if versions is not None and db.scalar(
+        select(models.Item.id).where(*_item_conditions(owner_id, item_id, None))
+    ) is not None:
+        raise VersionConflict()
+    return None
+
+def update_item(
+    db: Session,
+    owner_id: int,
+    item_id: int,
+    item: schemas.ItemCreate,
+    versions: Optional[List[int]] = None,
+) -> Optional[schemas.ItemResponse]:
+    """
+    Un único UPDATE ... WHERE id AND owner_id [AND version] RETURNING.
+    Retorna None si no existe; lanza VersionConflict si la versión no coincide.
+    """
+    stmt = (
+        update(models.Item)
+        .where(*_item_conditions(owner_id, item_id, versions))
+        .values(**item.dict(), version=models.Item.version + 1)
+        .returning(models.Item)
+    )
+    db_item = db.scalars(stmt).first()
+    if db_item is None:
+        return _missing_or_conflict(db, owner_id, item_id, versions)
+
+    # Se serializa antes del commit, que expira los atributos
+    updated = schemas.ItemResponse.model_validate(db_item)
+    touch_owner(db, owner_id)
+    db.commit()
+    return updated
+
+def patch_item(
+    db: Session,
+    owner_id: int,
+    item_id: int,
+    changes: dict,
+    versions: Optional[List[int]] = None,
+) -> Optional[schemas.ItemResponse]:
+    """
+    UPDATE solo de las columnas enviadas, y solo si alguna cambia de valor
+    (WHERE ... AND (col IS DISTINCT FROM valor OR ...)). Si nada cambia no se escribe
+    ni se sube la versión; se retorna el item tal cual.
+    """
+    if changes:
+        stmt = (
+            update(models.Item)
+            .where(
+                *_item_conditions(owner_id, item_id, versions),
+                or_(*(getattr(models.Item, key).is_distinct_from(value) for key, value in changes.items()))
+            )
+            .values(**changes, version=models.Item.version + 1)
+            .returning(models.Item)
+        )
+        db_item = db.scalars(stmt).first()
+        if db_item is not None:
+            updated = schemas.ItemResponse.model_validate(db_item)
+            touch_owner(db, owner_id)
+            db.commit()
+            return updated
+        db.rollback()
+
+    # Sin cambios, inexistente o versión distinta
+    db_item = _owned_item(db, owner_id, item_id)
+    if db_item is None:
+        return None
+    if versions is not None and db_item.version not in versions:
+        raise VersionConflict()
+    return schemas.ItemResponse.model_validate(db_item)
+
+def delete_item(db: Session, owner_id: int, item_id: int, versions: Optional[List[int]] = None) -> bool:
+    """
+    Un único DELETE ... WHERE id AND owner_id [AND version] RETURNING id.
+    Retorna False si no existe; lanza VersionConflict si la versión no coincide.
+    """
+    deleted = db.scalar(
+        delete(models.Item)
+        .where(*_item_conditions(owner_id, item_id, versions))
+        .returning(models.Item.id)
+    )
+    if deleted is None:
+        _missing_or_conflict(db, owner_id, item_id, versions)
+        return False
+
+    touch_owner(db, owner_id)
+    db.commit()
+    return True
+
+def _items_query(db: Session, owner_id: int, as_rows: bool, columns: Optional[list] = None):
+    """
+    Items del usuario como objetos ORM o, con as_rows, como tuplas de ITEM_COLUMNS
+    (sin identity map ni instancias). `columns` selecciona solo esas columnas.
+    """
+    if columns is not None:
+        entities = columns
+    else:
+        entities = ITEM_COLUMNS if as_rows else [models.Item]
+    return db.query(*entities).filter(models.Item.owner_id == owner_id)
+
+def _projection(fields: List[str], sort: str) -> list:
+    """
+    Columnas pedidas más las del orden, que el cursor necesita aunque no se devuelvan.
+    """
+    names = list(fields) + [column.key for column, _ in SORTS[sort] if column.key not in fields]
+    return [getattr(models.Item, name) for name in names]
+
+def list_items(db: Session, owner_id: int, sort: str, cursor: Optional[str], limit: int, as_rows: bool = False):
+    """
+    Una página de items del usuario; retorna (items, next_cursor).
+    """
+    query = _items_query(db, owner_id, as_rows)
+    return pagination.paginate(query, SORTS[sort], sort, cursor, limit)
+
+def _search_filters(
+    db: Session,
+    query,
+    nombre: Optional[str],
+    min_precio: Optional[float],
+    max_precio: Optional[float] = None,
+    en_stock: Optional[bool] = None,
+):
+    if nombre:
+        query = search.contains(db, query, models.Item.nombre, nombre)
+
+    if min_precio is not None:
+        query = query.filter(models.Item.precio >= min_precio)
+
+    if max_precio is not None:
+        query = query.filter(models.Item.precio <= max_precio)
+
+    if en_stock is not None:
+        query = query.filter(models.Item.en_stock == en_stock)
+    return query
+
+def search_items(
+    db: Session,
+    owner_id: int,
+    nombre: Optional[str],
+    min_precio: Optional[float],
+    sort: str,
+    cursor: Optional[str],
+    limit: int,
+    q: Optional[str] = None,
+    as_rows: bool = False,
+    max_precio: Optional[float] = None,
+    en_stock: Optional[bool] = None,
+    fields: Optional[List[str]] = None,
+):
+    """
+    Una página de items del usuario filtrados por nombre, rango de precio y/o stock.
+    Con `q` busca en nombre y descripcion y retorna los `limit` más relevantes (sin cursor).
+    Con `fields` solo se leen esas columnas (y las del orden); las filas son tuplas.
+    """
+    columns = _projection(fields, sort) if fields else None
+    query = _search_filters(
+        db, _items_query(db, owner_id, as_rows, columns), nombre, min_precio, max_precio, en_stock
+    )
+
+    if q:
+        return search.ranked(db, query, q).limit(limit).all(), None
+
+    return pagination.paginate(query, SORTS[sort], sort, cursor, limit)
+
+# ----------------------------
+# Estadísticas
+# ----------------------------
+def _price_bucket(db: Session, low: float, high: float, buckets: int):
+    """
+    Índice de tramo (0..buckets-1) de igual ancho entre low y high; high cae en el último.
+    """
+    precio = models.Item.precio
+    if db.get_bind().dialect.name == "postgresql":
+        return func.least(func.width_bucket(precio, low, high, buckets), buckets) - 1
+    # CAST trunca hacia cero, que para valores >= 0 equivale a floor(); min() acota el
+    # redondeo de precios justo por debajo de high, que podría dar `buckets`
+    return case(
+        (precio >= high, buckets - 1),
+        else_=func.min(cast((precio - low) * buckets / (high - low), Integer), buckets - 1)
+    )
+
+def item_stats(
+    db: Session,
+    owner_id: int,
+    nombre: Optional[str],
+    min_precio: Optional[float],
+    buckets: int,
+    max_precio: Optional[float] = None,
+    en_stock: Optional[bool] = None,
+) -> schemas.ItemStats:
+    """
+    Conteos, suma/promedio/mín/máx de precio e histograma de precios de los items
+    del usuario, con los mismos filtros que search_items. Una consulta de agregados
+    y, si hay items, una segunda con GROUP BY por tramo de precio.
+    """
+    def filtered(*entities):
+        query = db.query(*entities).filter(models.Item.owner_id == owner_id)
+        return _search_filters(db, query, nombre, min_precio, max_precio, en_stock)
+
+    precio = models.Item.precio
+    total, total_en_stock, precio_total, promedio, low, high = filtered(
+        func.count(models.Item.id),
+        func.coalesce(func.sum(case((models.Item.en_stock, 1), else_=0)), 0),
+        func.coalesce(func.sum(precio), 0),
+        func.avg(precio),
+        func.min(precio),
+        func.max(precio),
+    ).one()
+
+    histograma = []
+    if low is not None:
+        if low == high:
+            histograma = [schemas.PriceBucket(desde=low, hasta=high, cantidad=total)]
+        else:
+            bucket = _price_bucket(db, low, high, buckets).label("bucket")
+            counts = dict(
+                filtered(bucket, func.count()).filter(precio.is_not(None)).group_by(bucket).all()
+            )
+            width = (high - low) / buckets
+            histograma = [
+                schemas.PriceBucket(
+                    desde=low + index * width,
+                    hasta=high if index == buckets - 1 else low + (index + 1) * width,
+                    cantidad=counts.get(index, 0)
+                )
+                for index in range(buckets)
+            ]
+
+    return schemas.ItemStats(
+        total=total,
+        en_stock=total_en_stock,
+        precio_total=precio_total,
+        precio_promedio=promedio,
+        precio_min=low,
+        precio_max=high,
+        histograma=histograma,
+    )
+
+# ----------------------------
+# Items en lote
+# ----------------------------
+def _chunks(values: list, size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield start, values[start:start + size]
+
+def _duplicated_indexes(ids: List[int]) -> set:
+    seen, duplicated = set(), set()
+    for index, item_id in enumerate(ids):
+        if item_id in seen:
+            duplicated.add(index)
+        seen.add(item_id)
+    return duplicated
+
+def _commit_bulk(db: Session, owner_id: int, resultados: List[schemas.BulkItemResult]) -> None:
+    if any(r.ok for r in resultados):
+        touch_owner(db, owner_id)
+    db.commit()
+
+def bulk_create_items(db: Session, owner_id: int, items: List[schemas.ItemCreate]) -> List[schemas.BulkItemResult]:
+    """
+    Un INSERT ... RETURNING por bloque de BULK_CHUNK_SIZE filas y un único commit.
+    """
+    rows = [dict(item.dict(), owner_id=owner_id) for item in items]
+    _assign_item_ids(db, rows)
+    stmt = insert(models.Item).returning(models.Item.id, sort_by_parameter_order=True)
+
+    resultados = []
+    for start, chunk in _chunks(rows):
+        ids = db.scalars(stmt, chunk).all()
+        resultados += [
+            schemas.BulkItemResult(indice=start + offset, id=item_id, ok=True)
+            for offset, item_id in enumerate(ids)
+        ]
+    _commit_bulk(db, owner_id, resultados)
+    return resultados
+
+def create_items_batch(db: Session, entries: List[Tuple[int, schemas.ItemCreate]]) -> List[schemas.ItemResponse]:
+    """
+    Items de varios usuarios con un INSERT ... RETURNING por bloque y un único commit
+    (escritura agrupada, ver app/ingest.py). Retorna los items creados en el mismo orden.
+    """
+    rows = [dict(item.dict(), owner_id=owner_id) for owner_id, item in entries]
+    _assign_item_ids(db, rows)
+    stmt = insert(models.Item).returning(models.Item, sort_by_parameter_order=True)
+
+    created = []
+    for _, chunk in _chunks(rows):
+        created += [schemas.ItemResponse.model_validate(item) for item in db.scalars(stmt, chunk)]
+    # Siempre en el mismo orden, para que dos lotes concurrentes no se bloqueen mutuamente
+    for owner_id in sorted({owner_id for owner_id, _ in entries}):
+        touch_owner(db, owner_id)
+    db.commit()
+    return created
+
+def bulk_update_items(db: Session, owner_id: int, items: List[schemas.ItemBulkUpdate]) -> List[schemas.BulkItemResult]:
+    """
+    Un SELECT de los ids propios y un UPDATE executemany por bloque; un único commit.
+    """
+    table = models.Item.__table__
+    stmt = update(table).where(
+        table.c.id == bindparam("b_id"),
+        table.c.owner_id == owner_id
+    ).values(version=table.c.version + 1)
+    duplicated = _duplicated_indexes([item.id for item in items])
+
+    resultados = []
+    for start, chunk in _chunks(items):
+        owned = set(db.scalars(
+            select(models.Item.id).where(
+                models.Item.owner_id == owner_id,
+                models.Item.id.in_([item.id for item in chunk])
+            )
+        ))
+        params = []
+        for offset, item in enumerate(chunk):
+            index = start + offset
+            if index in duplicated:
+                resultados.append(schemas.BulkItemResult(indice=index, id=item.id, ok=False, error="Id duplicado"))
+            elif item.id not in owned:
+                resultados.append(schemas.BulkItemResult(indice=index, id=item.id, ok=False, error="Item no encontrado"))
+            else:
+                params.append(dict(item.dict(exclude={"id"}), b_id=item.id))
+                resultados.append(schemas.BulkItemResult(indice=index, id=item.id, ok=True))
+        if params:
+            db.execute(stmt, params)
+    _commit_bulk(db, owner_id, resultados)
+    return resultados
+
+def bulk_delete_items(db: Session, owner_id: int, ids: List[int]) -> List[schemas.BulkItemResult]:
+    """
+    Un DELETE ... RETURNING por bloque; un único commit.
+    """
+    duplicated = _duplicated_indexes(ids)
+
+    resultados = []
+    for start, chunk in _chunks(ids):
+        deleted = set(db.scalars(
+            delete(models.Item)
+            .where(models.Item.owner_id == owner_id, models.Item.id.in_(chunk))
+            .returning(models.Item.id)
+            .execution_options(synchronize_session=False)
+        ))
+        for offset, item_id in enumerate(chunk):
+            index = start + offset
+            if index in duplicated:
+                resultados.append(schemas.BulkItemResult(indice=index, id=item_id, ok=False, error="Id duplicado"))
+            elif item_id not in deleted:
+                resultados.append(schemas.BulkItemResult(indice=index, id=item_id, ok=False, error="Item no encontrado"))
+            else:
+                resultados.append(schemas.BulkItemResult(indice=index, id=item_id, ok=True))
+    _commit_bulk(db, owner_id, resultados)
+    return resultados
@@ -1,20 +1,330 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-import os
-from dotenv import load_dotenv
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+import threading
+import time
+from abc import ABC, abstractmethod
+from .config import settings
 
-load_dotenv()
+DATABASE_URL = settings.database_url
+# DB_ASYNC=true usa create_async_engine (asyncpg / aiosqlite) para las peticiones
+DB_ASYNC = settings.db_async
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# ----------------------------
+# Pool de conexiones
+# ----------------------------
+DB_POOL_SIZE = settings.db_pool_size
+DB_MAX_OVERFLOW = settings.db_max_overflow
+DB_POOL_TIMEOUT = settings.db_pool_timeout
+DB_POOL_RECYCLE = settings.db_pool_recycle
+DB_POOL_PRE_PING = settings.db_pool_pre_ping
+# Detrás de PgBouncer (modo transaction): sin pool propio y sin prepared statements
+DB_PGBOUNCER = settings.db_pgbouncer
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolMetricsMixin:
+    """
+    Mide cuánto tarda cada checkout y cuántos hilos/tareas esperan una conexión.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def _do_get(self):
+        with self._metrics_lock:
+            self.waiting += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._metrics_lock:
+                self.waiting -= 1
+                self.checkouts += 1
+                self.checkout_seconds += elapsed
+                self.max_checkout_seconds = max(self.max_checkout_seconds, elapsed)
+
+class InstrumentedQueuePool(PoolMetricsMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Argumentos de create_engine según las variables DB_POOL_* / DB_PGBOUNCER.
+    """
+    if url.startswith("sqlite") and ":memory:" in url:
+        return {}
+    if DB_PGBOUNCER:
+        # asyncpg cachea prepared statements por conexión, incompatibles con PgBouncer
+        connect_args = {"statement_cache_size": 0, "prepared_statement_cache_size": 0} if is_async else {}
+        return {"poolclass": NullPool, "connect_args": connect_args}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def pool_stats(engine) -> dict:
+    """
+    Estado del pool: conexiones en uso, en espera y latencia de checkout.
+    Sin engine (aún no creado) solo retorna {"class": None}.
+    """
+    if engine is None:
+        return {"class": None}
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, PoolMetricsMixin):
+        stats.update(
+            waiting=pool.waiting,
+            checkouts=pool.checkouts,
+            timeouts=pool.timeouts,
+            avg_checkout_ms=1000 * pool.checkout_seconds / pool.checkouts if pool.checkouts else 0.0,
+            max_checkout_ms=1000 * pool.max_checkout_seconds,
+        )
+    return stats
+
+def warm_up_pool(engine, connections: int) -> int:
+    """
+    Abre `connections` conexiones a la vez y las devuelve al pool, para que las
+    primeras peticiones no paguen el connect. Retorna cuántas se abrieron.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+async def warm_up_async_pool(engine, connections: int) -> int:
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = await engine.connect()
+            opened.append(conn)
+            await conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            await conn.close()
+    return len(opened)
+
+def dispose_after_fork() -> None:
+    """
+    Para gunicorn con preload_app: el worker recién creado descarta (sin cerrarlas)
+    las conexiones heredadas del proceso maestro.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+# ----------------------------
+# Engines perezosos
+# ----------------------------
+# El engine (y con él el driver: psycopg2, asyncpg...) se crea en el primer uso, no al
+# importar; en producción eso ocurre en el calentamiento del lifespan.
+# `database.engine` y `database.async_engine` siguen funcionando (ver __getattr__).
+_engine = None
+_async_engine = None
+_engine_lock = threading.Lock()
+
+# Se enlaza al engine cuando este se crea; usar get_db() o llamar antes a get_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+                SessionLocal.configure(bind=_engine)
+    return _engine
 
 Base = declarative_base()
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# ----------------------------
+# Modo asíncrono
+# ----------------------------
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """
+    Traduce una URL síncrona a su driver asíncrono (postgresql -> asyncpg, sqlite -> aiosqlite).
+    """
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    AsyncSessionLocal = async_sessionmaker(autoflush=False)
+
+def get_async_engine():
+    """
+    Engine asíncrono (None si DB_ASYNC no está activo), creado en el primer uso.
+    """
+    global _async_engine
+    if DB_ASYNC and _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                _async_engine = create_async_engine(
+                    to_async_url(DATABASE_URL),
+                    **engine_options(DATABASE_URL, is_async=True)
+                )
+                AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+def create_node(url: str, **session_options):
+    """
+    Engine (asíncrono si DB_ASYNC) y fábrica de sesiones para otra BD (réplicas, shards),
+    con las mismas opciones de pool que el primario.
+    """
+    if DB_ASYNC:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        engine = create_async_engine(to_async_url(url), **engine_options(url, is_async=True))
+        return engine, async_sessionmaker(engine, autoflush=False, **session_options)
+    engine = create_engine(url, **engine_options(url))
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine, **session_options)
+
+def current_engine():
+    """
+    El engine de las peticiones si ya existe (el asíncrono con DB_ASYNC), sin crearlo.
+    """
+    return _async_engine or _engine
+
+async def dispose_engines() -> None:
+    """
+    Cierra los engines creados; no crea (ni carga el driver de) los que nunca se usaron.
+    """
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ----------------------------
+# Runners: una sola API para ambos modos
+# ----------------------------
+class SessionRunner(ABC):
+    """
+    Ejecuta funciones de acceso a datos escritas contra una Session síncrona,
+    sin bloquear el event loop:
+      - modo síncrono: en el threadpool de FastAPI
+      - modo asíncrono: con AsyncSession.run_sync (I/O asíncrona real)
+    Los endpoints son async def y hacen `await db.run(crud.funcion, ...)`.
+    """
+    @abstractmethod
+    async def run(self, fn, *args, **kwargs):
+        ...
+
+    @abstractmethod
+    def stream(self, stmt):
+        """
+        Generador asíncrono de lotes (partitions) de una sentencia con yield_per.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+class SyncRunner(SessionRunner):
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def stream(self, stmt):
+        partitions = await run_in_threadpool(lambda: self.session.execute(stmt).partitions())
+        while True:
+            batch = await run_in_threadpool(next, partitions, None)
+            if batch is None:
+                break
+            yield batch
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.session.close)
+
+class AsyncRunner(SessionRunner):
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+    async def stream(self, stmt):
+        result = await self.session.stream(stmt)
+        async for batch in result.partitions():
+            yield batch
+
+    async def close(self) -> None:
+        await self.session.close()
+
+def open_runner() -> SessionRunner:
+    """
+    Runner con sesión propia fuera de una petición (tareas en segundo plano);
+    quien lo abre debe cerrarlo con `await runner.close()`.
+    """
+    if DB_ASYNC:
+        get_async_engine()
+        return AsyncRunner(AsyncSessionLocal())
+    get_engine()
+    return SyncRunner(SessionLocal())
+
+if DB_ASYNC:
+    async def get_runner():
+        get_async_engine()
+        async with AsyncSessionLocal() as session:
+            yield AsyncRunner(session)
+else:
+    def get_runner(db: Session = Depends(get_db)):
+        return SyncRunner(db)
@@ -0,0 +1,27 @@
+# app/etags.py
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+def item_etag(version: int) -> str:
+    """
+    ETag fuerte de un item: cambia con cada escritura (columna version).
+    """
+    return f'"v{version}"'
+
+def parse_if_match(header: Optional[str]) -> Optional[List[int]]:
+    """
+    Versiones aceptadas por una cabecera If-Match.
+    None si no hay precondición (sin cabecera o `*`).
+    Si ninguna ETag es de la forma "vN" la precondición no puede cumplirse: 412.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith('"v') and tag.endswith('"') and tag[2:-1].isdigit():
+            versions.append(int(tag[2:-1]))
+    if not versions:
+        raise HTTPException(status_code=412, detail="El item fue modificado por otra petición")
+    return versions
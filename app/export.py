@@ -0,0 +1,62 @@
+# app/export.py
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from . import models
+from .database import SessionRunner
+
+EXPORT_COLUMNS = ("id", "nombre", "descripcion", "precio", "en_stock", "owner_id")
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+async def _item_batches(db: SessionRunner, owner_id: int) -> AsyncIterator[list]:
+    """
+    Lee los items del usuario con un cursor de servidor, por lotes de EXPORT_BATCH_SIZE.
+    Solo hay un lote en memoria a la vez, sin importar cuántas filas tenga el usuario.
+    """
+    columns = [getattr(models.Item, name) for name in EXPORT_COLUMNS]
+    stmt = (
+        select(*columns)
+        .where(models.Item.owner_id == owner_id)
+        .order_by(models.Item.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    try:
+        async for batch in db.stream(stmt):
+            yield batch
+    finally:
+        # La dependencia de sesión ya terminó cuando se transmite la respuesta,
+        # así que la conexión reabierta por la exportación se libera aquí.
+        await db.close()
+
+async def stream_ndjson(db: SessionRunner, owner_id: int) -> AsyncIterator[str]:
+    async for batch in _item_batches(db, owner_id):
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+async def stream_csv(db: SessionRunner, owner_id: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in _item_batches(db, owner_id):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+STREAMERS = {
+    "ndjson": stream_ndjson,
+    "csv": stream_csv,
+}
@@ -0,0 +1,123 @@
+# app/http_cache.py
+# Caché HTTP de las lecturas de items:
+#   - ETag de listados derivada del contador de cambios del usuario (owner_versions)
+#     y de la URL, así que cambia en cuanto el usuario escribe cualquier item
+#   - If-None-Match -> 304 sin cargar items
+#   - LRU de cuerpos ya serializados; la generación forma parte de la clave,
+#     de modo que toda escritura invalida las entradas anteriores del usuario.
+#     El cuerpo se guarda como texto (valor JSON, válido para un backend compartido);
+#     los mayores de RESPONSE_CACHE_MAX_BODY_BYTES no se cachean y el total en memoria
+#     se acota a RESPONSE_CACHE_MAX_BYTES
+#   - FAST_JSON=true: los listados se leen como tuplas y se serializan con orjson,
+#     sin instancias ORM ni validación por fila de ItemResponse
+import hashlib
+import json
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la stdlib
+    orjson = None
+
+from . import cache, crud, pagination, schemas
+from .config import settings
+from .database import SessionRunner
+
+RESPONSE_CACHE_MAX_BODY_BYTES = settings.response_cache_max_body_bytes
+
+response_cache = cache.Cache(
+    "responses",
+    ttl=settings.response_cache_ttl_seconds,
+    max_entries=settings.response_cache_max_entries,
+    backend=cache.MemoryBackend(
+        settings.response_cache_max_entries,
+        max_bytes=settings.response_cache_max_bytes,
+        weigh=lambda entry: len(entry["body"]),
+    ),
+)
+
+# Los clientes pueden guardar la respuesta pero deben revalidarla (If-None-Match)
+CACHE_CONTROL = "private, no-cache"
+
+# Los endpoints pasan este valor como `as_rows` a crud.list_items / crud.search_items
+FAST_JSON = settings.fast_json
+
+_items_adapter = TypeAdapter(List[schemas.ItemResponse])
+
+def _matches(header: Optional[str], etag: str) -> bool:
+    """
+    Comparación débil de If-None-Match (ignora el prefijo W/).
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    plain = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == plain for tag in header.split(","))
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    Respuesta 304 si el cliente ya tiene la versión actual; si no, None.
+    """
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+def _dumps_rows(rows, fields: Sequence[str] = crud.ITEM_FIELDS) -> bytes:
+    """
+    Tuplas cuyas primeras columnas son `fields` -> lista JSON de objetos con esas claves.
+    Con los campos por defecto tiene la misma forma que List[ItemResponse].
+    """
+    objects = [dict(zip(fields, row)) for row in rows]
+    if orjson is not None:
+        return orjson.dumps(objects)
+    return json.dumps(objects, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def serialize_items(items, fields: Optional[Sequence[str]] = None) -> bytes:
+    if fields:
+        return _dumps_rows(items, fields)
+    if FAST_JSON:
+        return _dumps_rows(items)
+    return _items_adapter.dump_json(_items_adapter.validate_python(items, from_attributes=True))
+
+def _json_response(body: bytes, etag: str, next_cursor: Optional[str]) -> Response:
+    response = Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+    pagination.set_next_cursor(response, next_cursor)
+    return response
+
+async def cached_list(
+    request: Request,
+    db: SessionRunner,
+    owner_id: int,
+    load: Callable[[], Awaitable[Tuple[list, Optional[str]]]],
+    fields: Optional[Sequence[str]] = None,
+) -> Response:
+    """
+    Sirve un listado de items del usuario con ETag/304 y caché de cuerpos.
+    `load` solo se ejecuta si la respuesta no está en caché. Con `fields` las filas
+    son tuplas de columnas y solo se serializan esos campos.
+    """
+    generation = await db.run(crud.get_owner_version, owner_id)
+    key = f"{owner_id}:{generation}:{request.url.path}?{request.url.query}"
+    etag = 'W/"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    cached = response_cache.get(key)
+    if cached is not None:
+        return _json_response(cached["body"].encode("utf-8"), etag, cached["next_cursor"])
+
+    items, next_cursor = await load()
+    body = serialize_items(items, fields)
+    if len(body) <= RESPONSE_CACHE_MAX_BODY_BYTES:
+        response_cache.set(key, {"body": body.decode("utf-8"), "next_cursor": next_cursor})
+    return _json_response(body, etag, next_cursor)
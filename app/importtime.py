@@ -0,0 +1,74 @@
+# app/importtime.py
+# Informe de tiempo de importación de la app, a partir de `python -X importtime`.
+# Cada línea de stderr tiene la forma:
+#   import time: self [us] | cumulative | imported package
+# y la indentación del nombre indica el nivel de anidamiento (2 espacios por nivel).
+import os
+import subprocess
+import sys
+from typing import List, Optional
+
+# Módulos pesados que la app solo debe cargar en el primer uso (crypto y drivers de BD)
+HEAVY_MODULES = ("jose", "cryptography", "bcrypt", "passlib", "psycopg2", "psycopg", "asyncpg")
+
+class ImportEntry:
+    __slots__ = ("name", "self_us", "cumulative_us", "depth")
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+def parse(stderr: str) -> List[ImportEntry]:
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabecera "self [us] | cumulative | imported package"
+        raw_name = fields[2].rstrip()
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        entries.append(ImportEntry(name, int(fields[0]), int(fields[1]), depth))
+    return entries
+
+def measure(module: str = "app.main", env: Optional[dict] = None) -> List[ImportEntry]:
+    """
+    Importa `module` en un intérprete nuevo (sin módulos ya cargados) y parsea el resultado.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, **(env or {})}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+    return parse(result.stderr)
+
+def report(entries: List[ImportEntry], top: int = 15) -> dict:
+    """
+    Total (suma de los imports de primer nivel), tiempo propio agrupado por paquete
+    (los `top` más caros) y los módulos pesados que se cargaron.
+    """
+    packages = {}
+    for entry in entries:
+        package = entry.name.split(".")[0]
+        count, self_us = packages.get(package, (0, 0))
+        packages[package] = (count + 1, self_us + entry.self_us)
+    slowest = sorted(packages.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        "total_ms": sum(entry.cumulative_us for entry in entries if entry.depth == 0) / 1000,
+        "modules": len(entries),
+        "packages": [{"name": name, "modules": count, "ms": self_us / 1000} for name, (count, self_us) in slowest],
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in packages],
+    }
+
+def format_report(data: dict) -> str:
+    lines = [f"Importar la app: {data['total_ms']:.1f} ms ({data['modules']} módulos)", ""]
+    lines.append(f"{'ms':>9} {'módulos':>8}  paquete")
+    for package in data["packages"]:
+        lines.append(f"{package['ms']:>9.1f} {package['modules']:>8}  {package['name']}")
+    heavy = ", ".join(data["heavy_loaded"]) or "ninguno"
+    lines += ["", f"Módulos pesados cargados al importar: {heavy}"]
+    return "\n".join(lines)
@@ -0,0 +1,180 @@
+# app/ingest.py
+# Escritura agrupada (group commit) de POST /items/ con INGEST_BATCHING=true:
+#   - cada petición deja su item en una cola acotada del proceso y espera
+#   - un único flusher junta lo encolado durante INGEST_BATCH_MAX_WAIT_MS (o hasta
+#     INGEST_BATCH_MAX_ROWS filas) y lo inserta con INSERT multi-fila y un solo commit
+#   - cada petición responde cuando su lote ya hizo commit: no se pierde durabilidad
+#   - con la cola llena se responde 503 + Retry-After en lugar de encolar sin límite
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from . import crud, schemas, sharding
+from .config import settings
+
+INGEST_BATCHING = settings.ingest_batching
+INGEST_BATCH_MAX_ROWS = settings.ingest_batch_max_rows
+INGEST_BATCH_MAX_WAIT_MS = settings.ingest_batch_max_wait_ms
+INGEST_QUEUE_SIZE = settings.ingest_queue_size
+
+logger = logging.getLogger("app.ingest")
+
+class IngestQueueFull(Exception):
+    """
+    La cola de escritura agrupada está llena.
+    """
+
+class _Entry:
+    __slots__ = ("shard", "owner_id", "item", "future")
+
+    def __init__(self, shard: Optional[int], owner_id: int, item: schemas.ItemCreate, future: asyncio.Future):
+        self.shard = shard
+        self.owner_id = owner_id
+        self.item = item
+        self.future = future
+
+class BatchWriter:
+    """
+    Cola + flusher en el event loop del worker. Se arranca en el lifespan (o con el
+    primer submit si no hay lifespan) y stop() escribe lo que quede en la cola.
+    `open_runner(shard) -> SessionRunner` abre la sesión de cada lote (por defecto la
+    del shard, o del primario sin sharding); hay que poder cerrarla con close().
+    """
+    def __init__(self, max_rows: int, max_wait_ms: float, queue_size: int,
+                 open_runner: Callable = sharding.open_runner):
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.queue_size = queue_size
+        self.open_runner = open_runner
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.rows = 0
+        self.max_batch = 0
+        self.rejected = 0
+        self.fallback_rows = 0
+
+    @property
+    def running(self) -> bool:
+        # Una tarea de otro event loop (p. ej. de un TestClient anterior) no cuenta
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._full = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, shard: Optional[int], owner_id: int, item: schemas.ItemCreate) -> schemas.ItemResponse:
+        """
+        Encola el item y espera al commit de su lote. Lanza IngestQueueFull si no cabe.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_Entry(shard, owner_id, item, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise IngestQueueFull()
+        if self._queue.qsize() >= self.max_rows:
+            self._full.set()
+        return await future
+
+    def _drain(self, batch: List[Optional[_Entry]]) -> None:
+        while len(batch) < self.max_rows and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_rows and self.max_wait > 0 and batch[-1] is not None:
+                # Espera a que lleguen más filas, salvo que la cola ya tenga un lote completo
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+                self._drain(batch)
+            self._full.clear()
+
+            stopping = None in batch
+            entries = [entry for entry in batch if entry is not None]
+            if entries:
+                try:
+                    await self._flush(entries)
+                except Exception as error:
+                    logger.exception("Error inesperado al escribir un lote")
+                    self._fail(entries, error)
+
+    def _fail(self, entries: List[_Entry], error: Exception) -> None:
+        for entry in entries:
+            if not entry.future.done():
+                entry.future.set_exception(error)
+
+    async def _flush(self, entries: List[_Entry]) -> None:
+        self.batches += 1
+        self.rows += len(entries)
+        self.max_batch = max(self.max_batch, len(entries))
+        groups = {}
+        for entry in entries:
+            groups.setdefault(entry.shard, []).append(entry)
+        await asyncio.gather(*(self._flush_group(shard, group) for shard, group in groups.items()))
+
+    async def _flush_group(self, shard: Optional[int], entries: List[_Entry]) -> None:
+        runner = self.open_runner(shard)
+        try:
+            try:
+                created = await runner.run(
+                    crud.create_items_batch, [(entry.owner_id, entry.item) for entry in entries]
+                )
+            except Exception:
+                # Un lote fallido no arrastra a todos: se reintenta fila a fila
+                logger.warning("Lote de %s items fallido, se reintenta fila a fila", len(entries), exc_info=True)
+                await runner.run(lambda db: db.rollback())
+                await self._flush_one_by_one(runner, entries)
+                return
+            for entry, item in zip(entries, created):
+                if not entry.future.done():
+                    entry.future.set_result(item)
+        finally:
+            await runner.close()
+
+    async def _flush_one_by_one(self, runner, entries: List[_Entry]) -> None:
+        for entry in entries:
+            self.fallback_rows += 1
+            try:
+                item = await runner.run(crud.create_items_batch, [(entry.owner_id, entry.item)])
+            except Exception as error:
+                await runner.run(lambda db: db.rollback())
+                self._fail([entry], error)
+                continue
+            if not entry.future.done():
+                entry.future.set_result(item[0])
+
+    def stats(self) -> dict:
+        return {
+            "enabled": INGEST_BATCHING,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch": self.rows / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "rejected": self.rejected,
+            "fallback_rows": self.fallback_rows,
+        }
+
+writer = BatchWriter(INGEST_BATCH_MAX_ROWS, INGEST_BATCH_MAX_WAIT_MS, INGEST_QUEUE_SIZE)
@@ -0,0 +1,73 @@
+# app/lifecycle.py
+# Arranque y parada de cada proceso worker (lifespan de FastAPI).
+# El servidor no acepta tráfico hasta que termina el calentamiento:
+#   - abre DB_POOL_SIZE conexiones del pool y las deja listas
+#   - ejecuta una vez las consultas de los listados para compilar y cachear su SQL
+#   - crea los hilos del pool de bcrypt
+# El esquema ya no se crea al importar la app: `python -m app init-db`.
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.pool import QueuePool
+
+from . import auth, crud, database, ingest, replicas, sharding
+from .config import settings
+
+WARMUP_ENABLED = settings.warmup_enabled
+
+logger = logging.getLogger("app.lifecycle")
+
+def _prime_queries(db) -> None:
+    """
+    Consultas representativas con un owner inexistente: no devuelven filas, pero dejan
+    el SQL compilado en la caché de sentencias del engine.
+    """
+    crud.get_owner_version(db, 0)
+    crud.get_item_version(db, 0, 0)
+    for sort in crud.SORTS:
+        crud.list_items(db, 0, sort, None, 1)
+        crud.list_items(db, 0, sort, None, 1, True)
+
+async def warm_up() -> dict:
+    start = time.perf_counter()
+    report = {}
+    try:
+        if database.async_engine is not None:
+            if isinstance(database.async_engine.pool, QueuePool):
+                report["connections"] = await database.warm_up_async_pool(database.async_engine, database.DB_POOL_SIZE)
+            async with database.AsyncSessionLocal() as session:
+                await session.run_sync(_prime_queries)
+        else:
+            if isinstance(database.engine.pool, QueuePool):
+                report["connections"] = await run_in_threadpool(
+                    database.warm_up_pool, database.engine, database.DB_POOL_SIZE
+                )
+
+            def prime():
+                with database.SessionLocal() as db:
+                    _prime_queries(db)
+            await run_in_threadpool(prime)
+    except Exception:
+        # Sin BD (o sin esquema) el worker arranca igual; las peticiones darán el error real
+        logger.warning("Calentamiento de la BD incompleto", exc_info=True)
+
+    await run_in_threadpool(auth.hashing_pool.start)
+    report["seconds"] = time.perf_counter() - start
+    logger.info("Calentamiento terminado: %s", report)
+    return report
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ENABLED:
+        app.state.warmup = await warm_up()
+    if ingest.INGEST_BATCHING:
+        ingest.writer.start()
+    yield
+    # Lo que quede en la cola de escritura agrupada se escribe antes de cerrar los engines
+    await ingest.writer.stop()
+    auth.hashing_pool.shutdown()
+    await database.dispose_engines()
+    replicas.replicas.dispose()
+    sharding.shards.dispose()
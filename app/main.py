@@ -1,16 +1,46 @@
 # app/main.py
 from fastapi import FastAPI
+from fastapi.responses import Response
+from app import auth, database, http_cache, ingest, lifecycle, metrics, profiling, ratelimit, replicas, sharding
 from app.routes import users, items
-from app.database import Base, engine
 
-Base.metadata.create_all(bind=engine)
+# El esquema se crea con `python -m app init-db`, no al importar la app
+app = FastAPI(title="API Profesional FastAPI + PostgreSQL + JWT", lifespan=lifecycle.lifespan)
 
-app = FastAPI(title="API Profesional FastAPI + PostgreSQL + JWT")
+# Solo actúa con PROFILING_ENABLED=true (se comprueba en cada petición)
+app.add_middleware(profiling.ProfilingMiddleware)
+# Solo actúa con MAX_CONCURRENT_REQUESTS > 0
+app.add_middleware(ratelimit.AdmissionMiddleware)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(items.router)
+app.include_router(profiling.router)
 
 # Ruta raíz opcional
 @app.get("/")
 def root():
     return {"message": "API funcionando correctamente"}
+
+# Estadísticas internas (cachés, etc.)
+@app.get("/stats")
+def stats():
+    return {
+        "user_cache": users.user_cache.stats(),
+        "token_cache": auth.token_cache.stats(),
+        "response_cache": http_cache.response_cache.stats(),
+        "password_hashing": auth.hashing_pool.stats(),
+        "rate_limit": ratelimit.limiter.stats(),
+        "pool": database.pool_stats(database.current_engine()),
+        "replicas": replicas.replicas.stats(),
+        "shards": sharding.shards.stats(),
+        "ingest": ingest.writer.stats(),
+    }
+
+# Métricas para Prometheus (incluye las estadísticas de /stats como gauges)
+metrics.add_collector(metrics.StatsCollector("app", stats))
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
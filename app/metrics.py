@@ -0,0 +1,227 @@
+# app/metrics.py
+# Métricas de Prometheus con prometheus_client:
+#   - Counter / Gauge / Histogram en un registro propio (REGISTRY)
+#   - MetricsMiddleware: peticiones, latencia y peticiones en curso por ruta
+#   - consultas SQL por petición (eventos before/after_cursor_execute de Engine)
+#   - con varios workers (gunicorn.conf.py o `python -m app serve --workers N`)
+#     PROMETHEUS_MULTIPROC_DIR hace que cada proceso escriba sus valores en ese
+#     directorio y /metrics agrega los de todos los workers
+# Los percentiles (p50/p95/p99) se calculan en Prometheus con histogram_quantile().
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Iterable, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from .config import settings
+
+METRICS_ENABLED = settings.metrics_enabled
+# prometheus_client lo lee del entorno al importarse; lo fijan gunicorn.conf.py y `serve`
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Consultas por petición
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Plantillas de ruta recordadas por (método, path)
+ROUTE_CACHE_SIZE = 10000
+
+# ----------------------------
+# Registro
+# ----------------------------
+REGISTRY = CollectorRegistry()
+
+class StatsCollector:
+    """
+    Exporta los valores numéricos de una función de estadísticas ({"sección": {"clave": n}})
+    como gauges `<prefix>_<sección>_<clave>`. Son del proceso que responde: con varios
+    workers llevan la etiqueta `pid`.
+    """
+    def __init__(self, prefix: str, stats: Callable[[], dict]):
+        self.prefix = prefix
+        self.stats = stats
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        return gauges_from_stats(self.prefix, self.stats(), pid=os.getpid() if MULTIPROC_DIR else None)
+
+_collectors: List[StatsCollector] = []
+
+def add_collector(collector: StatsCollector) -> None:
+    _collectors.append(collector)
+    REGISTRY.register(collector)
+
+def render() -> bytes:
+    """
+    Texto de /metrics. En modo multiproceso se agregan los ficheros de todos los workers.
+    """
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _collectors:
+            registry.register(collector)
+    return generate_latest(registry)
+
+def gauges_from_stats(prefix: str, stats: dict, pid: Optional[int] = None) -> List[GaugeMetricFamily]:
+    """
+    {"user_cache": {"hits": 3, ...}, ...} -> gauges `<prefix>_user_cache_hits 3`.
+    Solo se exportan los valores numéricos.
+    """
+    families = []
+    for section, values in stats.items():
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{section}_{key}"
+            if pid is None:
+                families.append(GaugeMetricFamily(name, name, value=value))
+            else:
+                family = GaugeMetricFamily(name, name, labels=("pid",))
+                family.add_metric((str(pid),), value)
+                families.append(family)
+    return families
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Peticiones HTTP por ruta y código", ("method", "route", "status"),
+    registry=REGISTRY
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route"),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso", ("method", "route"),
+    multiprocess_mode="livesum", registry=REGISTRY
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Consultas SQL ejecutadas por petición", ("method", "route"),
+    buckets=COUNT_BUCKETS, registry=REGISTRY
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_request_duration_seconds", "Tiempo total en la base de datos por petición", ("method", "route"),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duración de cada consulta SQL", ("route",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds", "Duración de bcrypt", ("operation",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY
+)
+
+# ----------------------------
+# Consultas SQL por petición
+# ----------------------------
+class RequestMetrics:
+    """
+    Acumulador de la petición en curso. Es mutable a propósito: run_in_threadpool y
+    run_sync copian el contexto, pero todas las copias comparten este objeto.
+    """
+    __slots__ = ("route", "db_queries", "db_seconds")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    request = _current.get()
+    DB_QUERY_LATENCY.labels(route=request.route if request else "").observe(elapsed)
+    if request is not None:
+        request.db_queries += 1
+        request.db_seconds += elapsed
+
+# ----------------------------
+# Middleware HTTP
+# ----------------------------
+_routes: "OrderedDict[tuple, str]" = OrderedDict()
+_routes_lock = threading.Lock()
+
+def route_template(app, scope) -> str:
+    """
+    Plantilla de la ruta ("/items/{item_id}") para no crear una serie por id.
+    Se recuerda por (método, path) en un LRU acotado: solo un path nuevo recorre las rutas.
+    """
+    key = (scope["method"], scope["path"])
+    with _routes_lock:
+        template = _routes.get(key)
+        if template is not None:
+            _routes.move_to_end(key)
+            return template
+
+    template = "unmatched"
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            template = route.path
+            break
+
+    with _routes_lock:
+        _routes[key] = template
+        while len(_routes) > ROUTE_CACHE_SIZE:
+            _routes.popitem(last=False)
+    return template
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: cuenta peticiones, mide su latencia completa (incluido el cuerpo
+    en streaming) y las consultas SQL que hicieron.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        request = RequestMetrics(route)
+        token = _current.set(request)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method=method, route=route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            HTTP_REQUESTS.labels(method=method, route=route, status=status["code"]).inc()
+            HTTP_LATENCY.labels(method=method, route=route).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(method=method, route=route).observe(request.db_queries)
+            DB_SECONDS_PER_REQUEST.labels(method=method, route=route).observe(request.db_seconds)
+            _current.reset(token)
@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -21,14 +21,90 @@ class User(Base):
 # ----------------------------
 class Item(Base):
     __tablename__ = "items"
+    # ✅ Todas las consultas filtran primero por owner_id
+    __table_args__ = (
+        Index("ix_items_owner_id_id", "owner_id", "id"),
+        Index("ix_items_owner_id_precio", "owner_id", "precio"),
+        Index("ix_items_owner_id_nombre", "owner_id", "nombre"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String, index=True)
     descripcion = Column(String, nullable=True)
     precio = Column(Float)
     en_stock = Column(Boolean, default=True)
+    # ✅ Se incrementa en cada escritura (ETag / If-Match)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # ✅ CAMPO NUEVO - Foreign Key al usuario
     owner_id = Column(Integer, ForeignKey("users.id"))
     
     # ✅ Relación con usuario
     owner = relationship("User", back_populates="items")
+
+# ----------------------------
+# Contador de cambios por usuario
+# ----------------------------
+class OwnerVersion(Base):
+    """
+    Se incrementa en la misma transacción que cualquier escritura de items del usuario.
+    Las ETags de los listados se derivan de este contador.
+    """
+    __tablename__ = "owner_versions"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+# ----------------------------
+# Sharding de items (ver app/sharding.py)
+# ----------------------------
+class ShardDirectory(Base):
+    """
+    Excepciones al mapa de shards: usuarios movidos por el rebalanceo.
+    shard NULL = se está moviendo (sus peticiones de items reciben 503).
+    """
+    __tablename__ = "shard_directory"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(Integer, nullable=True)
+
+class ItemIdCounter(Base):
+    """
+    Una sola fila: siguiente id de item libre en todos los shards.
+    Cada proceso reserva bloques de ids para que no se repitan entre shards.
+    """
+    __tablename__ = "item_ids"
+    id = Column(Integer, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+# ----------------------------
+# Índices de búsqueda de texto (nombre + descripcion)
+# ----------------------------
+# PostgreSQL: índices GIN de pg_trgm; también los usa ILIKE '%texto%'.
+# SQLite: tabla FTS5 con tokenizer trigram, sincronizada con items por triggers.
+SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_items_nombre_trgm ON items USING gin (nombre gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_items_descripcion_trgm ON items USING gin (descripcion gin_trgm_ops)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+        "nombre, descripcion, content='items', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN "
+        "INSERT INTO items_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, nombre, descripcion) "
+        "VALUES ('delete', old.id, old.nombre, old.descripcion); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF nombre, descripcion ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, nombre, descripcion) "
+        "VALUES ('delete', old.id, old.nombre, old.descripcion); "
+        "INSERT INTO items_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion); "
+        "END",
+    ],
+}
+
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Item.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+
+event.listen(Item.__table__, "before_drop", DDL("DROP TABLE IF EXISTS items_fts").execute_if(dialect="sqlite"))
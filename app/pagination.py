@@ -0,0 +1,77 @@
+# app/pagination.py
+import base64
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# (columna, descendente)
+SortSpec = Sequence[Tuple[object, bool]]
+
+# ----------------------------
+# Cursores opacos
+# ----------------------------
+def encode_cursor(sort: str, values: list) -> str:
+    """
+    Codifica el orden y los valores de la última fila en un token opaco.
+    """
+    raw = json.dumps({"s": sort, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, sort: str) -> list:
+    """
+    Decodifica un cursor y comprueba que corresponde al mismo orden.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["k"]
+        if data["s"] != sort or not isinstance(values, list):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+# ----------------------------
+# Paginación por keyset
+# ----------------------------
+def keyset_filter(spec: SortSpec, values: list):
+    """
+    Construye (a > x) OR (a = x AND b > y) ... respetando la dirección de cada columna.
+    """
+    if len(values) != len(spec):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    clauses = []
+    for i, (column, desc) in enumerate(spec):
+        equal = [col == values[j] for j, (col, _) in enumerate(spec[:i])]
+        step = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+def order_by(spec: SortSpec) -> list:
+    return [column.desc() if desc else column.asc() for column, desc in spec]
+
+def paginate(query, spec: SortSpec, sort: str, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Aplica orden y keyset a la consulta y retorna (filas, next_cursor).
+    La latencia no depende de la profundidad de la página, a diferencia de OFFSET.
+    """
+    if cursor:
+        query = query.filter(keyset_filter(spec, decode_cursor(cursor, sort)))
+    rows = query.order_by(*order_by(spec)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, column.key) for column, _ in spec])
+    return rows, next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,292 @@
+# app/profiling.py
+# Perfilado bajo demanda y registro de consultas lentas:
+#   - PROFILING_ENABLED=true activa el perfilado de las peticiones con cabecera
+#     `X-Profile: 1` (solo con un X-Debug-Token válido) o de una muestra aleatoria
+#     (PROFILE_SAMPLE_RATE)
+#   - cada petición perfilada guarda el árbol de llamadas (cProfile) y todas sus
+#     sentencias SQL con su duración; las que superan PROFILE_EXPLAIN_MS llevan su EXPLAIN
+#   - el resultado va a PROFILE_DIR (JSON + .prof para snakeviz; se conservan los
+#     PROFILE_MAX_KEPT más recientes) y a /debug/profiles,
+#     que exige la cabecera X-Debug-Token con PROFILE_DEBUG_TOKEN (sin token no se sirve)
+#   - SLOW_QUERY_LOG_MS > 0 registra en el logger "app.slow_query" toda sentencia
+#     más lenta que ese umbral, se perfile o no la petición
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+PROFILING_ENABLED = settings.profiling_enabled
+PROFILE_SAMPLE_RATE = settings.profile_sample_rate
+PROFILE_HEADER = "x-profile"
+DEBUG_TOKEN_HEADER = "x-debug-token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_DIR = settings.profile_dir
+PROFILE_EXPLAIN_MS = settings.profile_explain_ms
+PROFILE_MAX_KEPT = settings.profile_max_kept
+PROFILE_DEBUG_TOKEN = settings.profile_debug_token
+PROFILE_TOP_FUNCTIONS = 40
+SLOW_QUERY_LOG_MS = settings.slow_query_log_ms
+
+slow_query_log = logging.getLogger("app.slow_query")
+
+EXPLAIN_PREFIXES = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "mysql": "EXPLAIN ",
+}
+
+# ----------------------------
+# Perfil de una petición
+# ----------------------------
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.statements: List[dict] = []
+        self.call_tree = ""
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "sql_count": len(self.statements),
+            "sql_ms": round(sum(s["duration_ms"] for s in self.statements), 3),
+        }
+
+    def to_dict(self) -> dict:
+        return dict(self.summary(), statements=self.statements, call_tree=self.call_tree)
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+# Perfiles recientes para /debug/profiles (los más nuevos al final)
+_recent: "OrderedDict[str, RequestProfile]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+# cProfile solo admite un perfilador activo por hilo: una petición perfilada a la vez
+_profiler_lock = threading.Lock()
+
+def _keep(profile: RequestProfile) -> None:
+    with _recent_lock:
+        _recent[profile.id] = profile
+        while len(_recent) > PROFILE_MAX_KEPT:
+            _recent.popitem(last=False)
+
+def _write(profile: RequestProfile, profiler: cProfile.Profile) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{int(profile.started_at)}-{profile.id}")
+    profiler.dump_stats(base + ".prof")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+    _prune_files()
+
+def _prune_files() -> None:
+    """
+    Borra de PROFILE_DIR los perfiles (.json + .prof) más antiguos por encima de PROFILE_MAX_KEPT.
+    """
+    profiles = {}
+    with os.scandir(PROFILE_DIR) as entries:
+        for entry in entries:
+            name, ext = os.path.splitext(entry.name)
+            if ext in (".json", ".prof") and entry.is_file():
+                mtime = entry.stat().st_mtime
+                profiles.setdefault(name, []).append((mtime, entry.path))
+    oldest = sorted(profiles.values(), key=lambda files: min(mtime for mtime, _ in files))
+    for files in oldest[:max(0, len(oldest) - PROFILE_MAX_KEPT)]:
+        for _, path in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # otro worker ya lo borró
+
+def _call_tree(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+def _finish(profile: RequestProfile, profiler: cProfile.Profile) -> None:
+    profile.call_tree = _call_tree(profiler)
+    _keep(profile)
+    _write(profile, profiler)
+
+def clear() -> None:
+    with _recent_lock:
+        _recent.clear()
+
+# ----------------------------
+# Sentencias SQL
+# ----------------------------
+def _explain(conn, statement: str, parameters) -> str:
+    """
+    Plan de la sentencia en la misma conexión, con un cursor DBAPI aparte para no
+    disparar de nuevo los eventos de SQLAlchemy.
+    Dentro de una transacción va en un SAVEPOINT: en PostgreSQL un EXPLAIN fallido
+    abortaría la transacción de la petición; así se deshace solo el EXPLAIN.
+    (SQLite no aborta la transacción por un error y su SAVEPOINT fuera de una la abriría.)
+    """
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None:
+        return ""
+    savepoint = conn.dialect.name != "sqlite" and conn.in_transaction()
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute("SAVEPOINT profiling_explain")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+            except Exception:
+                if savepoint:
+                    cursor.execute("ROLLBACK TO SAVEPOINT profiling_explain")
+                raise
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT profiling_explain")
+            return plan
+        finally:
+            cursor.close()
+    except Exception as error:  # el EXPLAIN nunca debe romper la petición
+        return f"EXPLAIN falló: {error}"
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profiling_query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("profiling_query_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+
+    if SLOW_QUERY_LOG_MS > 0 and elapsed_ms >= SLOW_QUERY_LOG_MS:
+        slow_query_log.warning("%.1f ms: %s", elapsed_ms, statement)
+
+    profile = _current.get()
+    if profile is None:
+        return
+    # No se guardan los parámetros: pueden contener datos personales o hashes
+    record = {"sql": statement, "duration_ms": round(elapsed_ms, 3), "executemany": executemany}
+    if elapsed_ms >= PROFILE_EXPLAIN_MS and not executemany:
+        record["explain"] = _explain(conn, statement, parameters)
+    profile.statements.append(record)
+
+# ----------------------------
+# Middleware
+# ----------------------------
+def _valid_token(token: Optional[str]) -> bool:
+    return bool(PROFILE_DEBUG_TOKEN) and hmac.compare_digest(
+        (token or "").encode(), PROFILE_DEBUG_TOKEN.encode()
+    )
+
+def _wants_profile(scope) -> bool:
+    """
+    X-Profile solo cuenta con un X-Debug-Token válido: cualquier cliente podría si no
+    imponer el coste de cProfile y serializar el tráfico en _profiler_lock.
+    Sin token, solo la muestra aleatoria perfila.
+    """
+    if not PROFILING_ENABLED:
+        return False
+    headers = dict(scope.get("headers", ()))
+    requested = headers.get(PROFILE_HEADER.encode(), b"").strip() in (b"1", b"true")
+    if requested and _valid_token(headers.get(DEBUG_TOKEN_HEADER.encode(), b"").decode("latin-1")):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: perfila la petición si se pidió (o salió en la muestra).
+    cProfile mide el hilo del event loop (también lo que otras peticiones concurrentes
+    ejecuten en él); el SQL de la petición se registra en cualquier hilo.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            return await self.app(scope, receive, send)
+        if not _profiler_lock.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())
+                ]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            _profiler_lock.release()
+            _current.reset(token)
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            # Formatear pstats y escribir los ficheros fuera del event loop
+            await run_in_threadpool(_finish, profile, profiler)
+
+# ----------------------------
+# Endpoints de depuración
+# ----------------------------
+# Los perfiles incluyen SQL y tiempos de peticiones de todos los usuarios
+def _require_access(x_debug_token: Optional[str] = Header(None)) -> None:
+    """
+    404 si el perfilado o el token no están configurados; 403 con un token incorrecto.
+    """
+    if not PROFILING_ENABLED or not PROFILE_DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _valid_token(x_debug_token):
+        raise HTTPException(status_code=403, detail="Token de depuración inválido")
+
+router = APIRouter(
+    prefix="/debug/profiles", tags=["debug"], include_in_schema=False,
+    dependencies=[Depends(_require_access)]
+)
+
+@router.get("/")
+def list_profiles():
+    """
+    Resumen de los perfiles recientes, del más nuevo al más antiguo.
+    """
+    with _recent_lock:
+        profiles = list(_recent.values())
+    return [profile.summary() for profile in reversed(profiles)]
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str):
+    with _recent_lock:
+        profile = _recent.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return profile.to_dict()
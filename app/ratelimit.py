@@ -0,0 +1,252 @@
+# app/ratelimit.py
+# Control de admisión:
+#   - token bucket por presupuesto (login, register, items, search, bulk) y por identidad:
+#     el `sub` del JWT o, sin token válido, la IP del cliente
+#   - 429 con Retry-After cuando el bucket está vacío
+#   - límite global de peticiones en curso (MAX_CONCURRENT_REQUESTS): por encima se
+#     responde 503 de inmediato en lugar de encolar trabajo que el pool de BD no puede atender
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter
+
+from . import auth, metrics
+from .config import settings
+
+RATE_LIMIT_ENABLED = settings.rate_limit_enabled
+RATE_LIMIT_MAX_KEYS = settings.rate_limit_max_keys
+MAX_CONCURRENT_REQUESTS = settings.max_concurrent_requests
+# Rutas que siguen respondiendo aunque el servidor esté saturado
+ADMISSION_EXEMPT_PATHS = ("/metrics", "/stats")
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600}
+
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Peticiones rechazadas con 429 por presupuesto", ("budget",),
+    registry=metrics.REGISTRY
+)
+OVERLOAD_REJECTED = Counter(
+    "overload_rejected_total", "Peticiones rechazadas con 503 por el límite de concurrencia",
+    registry=metrics.REGISTRY
+)
+
+# ----------------------------
+# Presupuestos
+# ----------------------------
+class Budget:
+    """
+    `capacity` peticiones por `period` segundos (ráfaga = capacity), por usuario o por IP.
+    """
+    def __init__(self, capacity: float, period: float, key: str = "user"):
+        self.capacity = capacity
+        self.period = period
+        self.key = key
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, spec: str, key: str = "user") -> Optional["Budget"]:
+        """
+        "20/s", "600/m", "100/h"; "0" u "off" desactiva el presupuesto.
+        """
+        spec = spec.strip().lower()
+        if spec in ("0", "off", ""):
+            return None
+        count, _, unit = spec.partition("/")
+        return cls(float(count), _PERIODS[unit or "s"], key)
+
+DEFAULT_BUDGETS = {
+    "login": ("10/m", "ip"),
+    "register": ("5/m", "ip"),
+    "items": ("100/s", "user"),
+    "search": ("20/s", "user"),
+    "bulk": ("30/m", "user"),
+}
+
+def budgets_from_settings(overrides: Dict[str, str]) -> Dict[str, Budget]:
+    """
+    Presupuestos por defecto, sobrescribibles con RATE_LIMIT_<NOMBRE> (p. ej. RATE_LIMIT_SEARCH=50/s).
+    """
+    budgets = {}
+    for name, (spec, key) in DEFAULT_BUDGETS.items():
+        budget = Budget.parse(overrides.get(name, spec), key)
+        if budget is not None:
+            budgets[name] = budget
+    return budgets
+
+# ----------------------------
+# Backends
+# ----------------------------
+class RateLimitBackend(ABC):
+    """
+    Interfaz de almacenamiento de los buckets.
+    Un backend compartido entre procesos (p. ej. Redis con un script Lua que haga la
+    misma cuenta de forma atómica) solo tiene que implementar estos métodos.
+    """
+    @abstractmethod
+    def acquire(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        """
+        Consume `cost` tokens; retorna 0 si se admite o los segundos hasta que haya tokens.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def __len__(self) -> int:
+        return 0
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Buckets en memoria del proceso; se olvidan los menos usados por encima de max_keys.
+    Con varios workers cada uno aplica el presupuesto por separado.
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# ----------------------------
+# Limitador
+# ----------------------------
+class RateLimiter:
+    def __init__(self, budgets: Dict[str, Budget], backend: Optional[RateLimitBackend] = None):
+        self.budgets = budgets
+        self.backend = backend or MemoryBackend(RATE_LIMIT_MAX_KEYS)
+        # Rechazos de este proceso para /stats (el total de todos los workers está en /metrics)
+        self.rejected: Dict[str, int] = {}
+
+    def set_backend(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    def reset(self) -> None:
+        self.backend.clear()
+
+    def check(self, name: str, identity: str) -> None:
+        """
+        Lanza 429 con Retry-After si `identity` agotó el presupuesto `name`.
+        """
+        budget = self.budgets.get(name)
+        if budget is None:
+            return
+        wait = self.backend.acquire(f"{name}:{identity}", budget.capacity, budget.rate)
+        if wait > 0:
+            RATE_LIMITED.labels(budget=name).inc()
+            self.rejected[name] = self.rejected.get(name, 0) + 1
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiadas peticiones, inténtalo más tarde",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    def stats(self) -> dict:
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "keys": len(self.backend),
+            "budgets": {name: f"{b.capacity:g}/{b.period:g}s por {b.key}" for name, b in self.budgets.items()},
+            "rejected": {name: self.rejected.get(name, 0) for name in self.budgets},
+        }
+
+limiter = RateLimiter(budgets_from_settings(settings.rate_limits))
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "desconocido"
+
+def _identity(request: Request, key: str) -> str:
+    """
+    "user:<sub>" si el JWT es válido (decode_token está cacheado), si no "ip:<ip>".
+    """
+    if key == "user":
+        header = request.headers.get("authorization", "")
+        scheme, _, token = header.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                sub = auth.decode_token(token).get("sub")
+            except auth.JWTError:
+                sub = None
+            if sub is not None:
+                return f"user:{sub}"
+    return f"ip:{client_ip(request)}"
+
+def limit(*names: str):
+    """
+    Dependencia que consume un token de cada presupuesto indicado:
+    `dependencies=[Depends(ratelimit.limit("items", "search"))]`.
+    """
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        for name in names:
+            budget = limiter.budgets.get(name)
+            if budget is not None:
+                limiter.check(name, _identity(request, budget.key))
+    return dependency
+
+# ----------------------------
+# Límite global de concurrencia
+# ----------------------------
+class AdmissionMiddleware:
+    """
+    Middleware ASGI: con MAX_CONCURRENT_REQUESTS > 0, las peticiones por encima del
+    límite reciben 503 + Retry-After sin llegar a la aplicación.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or MAX_CONCURRENT_REQUESTS <= 0
+            or scope["path"] in ADMISSION_EXEMPT_PATHS
+        ):
+            return await self.app(scope, receive, send)
+
+        if self.in_flight >= MAX_CONCURRENT_REQUESTS:
+            OVERLOAD_REJECTED.inc()
+            response = JSONResponse(
+                {"detail": "Servidor ocupado, inténtalo de nuevo"},
+                status_code=503,
+                headers={"Retry-After": "1"}
+            )
+            return await response(scope, receive, send)
+
+        # Sin await entre la comprobación y el incremento: el event loop no puede intercalar otra petición
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,217 @@
+# app/replicas.py
+# Réplicas de lectura (DATABASE_REPLICA_URLS):
+#   - las dependencias de solo lectura usan get_read_runner; las escrituras siguen en el primario
+#   - balanceo round_robin o least_connections (sesiones abiertas por réplica)
+#   - cada réplica mide su retraso de replicación como mucho cada DB_REPLICA_CHECK_SECONDS;
+#     si supera DB_REPLICA_MAX_LAG_SECONDS o no responde, se lee del primario
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import make_url
+
+from . import database
+from .config import settings
+
+REPLICA_URLS = [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+REPLICA_STRATEGY = settings.db_replica_strategy
+REPLICA_MAX_LAG_SECONDS = settings.db_replica_max_lag_seconds
+REPLICA_CHECK_SECONDS = settings.db_replica_check_seconds
+
+STRATEGIES = ("round_robin", "least_connections")
+
+logger = logging.getLogger("app.replicas")
+
+def replication_lag(conn) -> float:
+    """
+    Segundos de retraso de la réplica respecto al primario (0 si no aplica).
+    En PostgreSQL, 0 si ya aplicó todo el WAL recibido; si no, la antigüedad de la
+    última transacción aplicada. Otros motores no replican: 0.
+    """
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    lag = conn.exec_driver_sql(
+        "SELECT CASE"
+        " WHEN NOT pg_is_in_recovery() THEN 0"
+        " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ).scalar()
+    return float(lag or 0)
+
+class Replica:
+    """
+    Una réplica: engine (síncrono o asíncrono según DB_ASYNC) creado en el primer uso,
+    sesiones abiertas y último retraso medido.
+    """
+    def __init__(self, url: str):
+        self.url = url
+        self.in_use = 0
+        self.reads = 0
+        self.lag: Optional[float] = None
+        self.healthy = True
+        self.checked_at = float("-inf")
+        self._engine = None
+        self._sessions = None
+        self._lock = threading.Lock()
+        self._checking = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return make_url(self.url).render_as_string(hide_password=True)
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine, self._sessions = database.create_node(self.url)
+        return self._engine
+
+    def session(self):
+        self.engine
+        return self._sessions()
+
+    def due(self, now: float) -> bool:
+        return now - self.checked_at >= REPLICA_CHECK_SECONDS
+
+    def record(self, lag: Optional[float], now: float) -> None:
+        self.healthy = lag is not None
+        self.lag = lag
+        self.checked_at = now
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.in_use += 1
+            self.reads += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def dispose(self, close: bool = True) -> None:
+        engine, self._engine = self._engine, None
+        if engine is None:
+            return
+        sync_engine = getattr(engine, "sync_engine", engine)
+        sync_engine.dispose(close=close)
+
+class ReplicaSet:
+    """
+    Elige la réplica de cada lectura. `lag_probe(conn) -> segundos` se puede sustituir
+    (tests, o una consulta distinta para otro motor).
+    """
+    def __init__(self, urls: List[str], strategy: str = "round_robin",
+                 lag_probe: Callable = replication_lag):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"DB_REPLICA_STRATEGY debe ser uno de {STRATEGIES}")
+        self.replicas = [Replica(url) for url in urls]
+        self.strategy = strategy
+        self.lag_probe = lag_probe
+        self.fallbacks = 0
+        self._turn = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _usable(self, replica: Replica) -> bool:
+        return replica.healthy and (replica.lag or 0) <= REPLICA_MAX_LAG_SECONDS
+
+    def _pick(self) -> Optional[Replica]:
+        usable = [replica for replica in self.replicas if self._usable(replica)]
+        if not usable:
+            self.fallbacks += 1
+            return None
+        if self.strategy == "least_connections":
+            replica = min(usable, key=lambda r: r.in_use)
+        else:
+            replica = usable[next(self._turn) % len(usable)]
+        replica.acquire()
+        return replica
+
+    def _due(self) -> List[Replica]:
+        """
+        Réplicas cuyo retraso hay que volver a medir; solo un hilo mide cada una.
+        """
+        now = time.monotonic()
+        return [replica for replica in self.replicas
+                if replica.due(now) and replica._checking.acquire(blocking=False)]
+
+    def _failed(self, replica: Replica) -> None:
+        logger.warning("Réplica %s no disponible, se lee del primario", replica.name, exc_info=True)
+        replica.record(None, time.monotonic())
+
+    def choose(self) -> Optional[Replica]:
+        """
+        Réplica para una lectura (ya contada en in_use; liberar con release) o None para el primario.
+        """
+        for replica in self._due():
+            try:
+                with replica.engine.connect() as conn:
+                    replica.record(self.lag_probe(conn), time.monotonic())
+            except Exception:
+                self._failed(replica)
+            finally:
+                replica._checking.release()
+        return self._pick()
+
+    async def achoose(self) -> Optional[Replica]:
+        for replica in self._due():
+            try:
+                async with replica.engine.connect() as conn:
+                    replica.record(await conn.run_sync(self.lag_probe), time.monotonic())
+            except Exception:
+                self._failed(replica)
+            finally:
+                replica._checking.release()
+        return self._pick()
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.dispose(close)
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replicas),
+            "strategy": self.strategy,
+            "healthy": sum(1 for replica in self.replicas if self._usable(replica)),
+            "reads": sum(replica.reads for replica in self.replicas),
+            "fallbacks": self.fallbacks,
+            "nodes": [
+                {"url": replica.name, "in_use": replica.in_use, "reads": replica.reads,
+                 "lag_seconds": replica.lag, "healthy": replica.healthy}
+                for replica in self.replicas
+            ],
+        }
+
+replicas = ReplicaSet(REPLICA_URLS, REPLICA_STRATEGY)
+
+# ----------------------------
+# Dependencias de lectura
+# ----------------------------
+# Dependen de get_runner: sin réplica disponible se usa esa misma sesión del primario
+# (que no abre conexión hasta la primera consulta), y los overrides de get_db siguen valiendo.
+if database.DB_ASYNC:
+    async def get_read_runner(primary: database.SessionRunner = Depends(database.get_runner)):
+        replica = await replicas.achoose() if replicas else None
+        if replica is None:
+            yield primary
+            return
+        try:
+            async with replica.session() as session:
+                yield database.AsyncRunner(session)
+        finally:
+            replica.release()
+else:
+    def get_read_runner(primary: database.SessionRunner = Depends(database.get_runner)):
+        replica = replicas.choose() if replicas else None
+        if replica is None:
+            yield primary
+            return
+        try:
+            with replica.session() as session:
+                yield database.SyncRunner(session)
+        finally:
+            replica.release()
@@ -1,136 +1,323 @@
 # app/routes/items.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from .. import schemas, models, database
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from .. import schemas, database, pagination, export, crud, etags, http_cache, ingest, ratelimit, sharding
 from .users import get_current_user
 
 router = APIRouter(
     prefix="/items",
-    tags=["items"]
+    tags=["items"],
+    dependencies=[Depends(ratelimit.limit("items"))]
 )
 
+# Operaciones masivas: máximo por petición
+BULK_MAX_ITEMS = 5000
+
+# Órdenes de los listados (ver crud.SORTS); "-" es descendente
+SortOption = Literal["id", "-id", "precio", "-precio", "nombre", "-nombre"]
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    "id,nombre" -> ["id", "nombre"]; 400 si algún campo no es de ItemResponse.
+    """
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in crud.ITEM_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(unknown)}")
+    return names or None
+
+def _bulk_response(resultados: List[schemas.BulkItemResult]) -> schemas.BulkResponse:
+    exitosos = sum(1 for r in resultados if r.ok)
+    return schemas.BulkResponse(exitosos=exitosos, fallidos=len(resultados) - exitosos, resultados=resultados)
+
 # ----------------------------
 # Crear un item
 # ----------------------------
 @router.post("/", response_model=schemas.ItemResponse)
-def create_item(
+async def create_item(
     item: schemas.ItemCreate,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    response: Response,
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    primary: database.SessionRunner = Depends(database.get_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
     """
     Crear un item solo para el usuario logueado.
+    Con INGEST_BATCHING se inserta junto con otros en un lote (responde tras su commit).
     """
-    db_item = models.Item(**item.dict(), owner_id=current_user.id)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    if ingest.INGEST_BATCHING:
+        shard = await sharding.owner_shard(current_user.id, primary)
+        # Devuelve al pool la conexión de la petición (p. ej. la de get_current_user) mientras
+        # espera el lote: el flusher también necesita una
+        await primary.close()
+        try:
+            db_item = await ingest.writer.submit(shard, current_user.id, item)
+        except ingest.IngestQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Servidor ocupado, inténtalo de nuevo",
+                headers={"Retry-After": "1"}
+            )
+        response.headers["ETag"] = etags.item_etag(db_item.version)
+        return db_item
+
+    db_item = await db.run(crud.create_item, current_user.id, item)
+    response.headers["ETag"] = etags.item_etag(db_item.version)
     return db_item
 
+# ----------------------------
+# Crear items en lote
+# ----------------------------
+@router.post("/bulk", response_model=schemas.BulkResponse, dependencies=[Depends(ratelimit.limit("bulk"))])
+async def bulk_create_items(
+    items: List[schemas.ItemCreate] = Body(..., max_length=BULK_MAX_ITEMS),
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Crea varios items en una sola transacción.
+    Un INSERT ... RETURNING por bloque de filas y un único commit.
+    """
+    return _bulk_response(await db.run(crud.bulk_create_items, current_user.id, items))
+
+# ----------------------------
+# Actualizar items en lote
+# ----------------------------
+@router.patch("/bulk", response_model=schemas.BulkResponse, dependencies=[Depends(ratelimit.limit("bulk"))])
+async def bulk_update_items(
+    items: List[schemas.ItemBulkUpdate] = Body(..., max_length=BULK_MAX_ITEMS),
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Actualiza varios items del usuario logueado en una sola transacción.
+    Los ids inexistentes, ajenos o repetidos se reportan como fallidos.
+    """
+    return _bulk_response(await db.run(crud.bulk_update_items, current_user.id, items))
+
+# ----------------------------
+# Eliminar items en lote
+# ----------------------------
+@router.delete("/bulk", response_model=schemas.BulkResponse, dependencies=[Depends(ratelimit.limit("bulk"))])
+async def bulk_delete_items(
+    ids: List[int] = Body(..., max_length=BULK_MAX_ITEMS),
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Elimina varios items del usuario logueado con un DELETE ... RETURNING por bloque.
+    """
+    return _bulk_response(await db.run(crud.bulk_delete_items, current_user.id, ids))
+
 # ----------------------------
 # Obtener todos los items del usuario
 # ----------------------------
 @router.get("/", response_model=List[schemas.ItemResponse])
-def get_items(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+async def get_items(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    sort: SortOption = "id",
+    db: database.SessionRunner = Depends(sharding.get_item_read_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
     """
-    Retorna todos los items del usuario logueado.
+    Retorna los items del usuario logueado, paginados por cursor.
+    El cursor de la siguiente página viaja en la cabecera X-Next-Cursor.
+    Responde 304 si la ETag de If-None-Match sigue vigente.
     """
-    items = db.query(models.Item).filter(models.Item.owner_id == current_user.id).all()
-    return items
+    return await http_cache.cached_list(
+        request, db, current_user.id,
+        lambda: db.run(crud.list_items, current_user.id, sort, cursor, limit, http_cache.FAST_JSON)
+    )
+
+# ----------------------------
+# Exportar todos los items del usuario (streaming)
+# ----------------------------
+@router.get("/export")
+async def export_items(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    db: database.SessionRunner = Depends(sharding.get_item_read_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Exporta todos los items del usuario logueado como NDJSON o CSV.
+    Se transmite por lotes, así que la memoria no crece con el número de filas.
+    """
+    return StreamingResponse(
+        export.STREAMERS[formato](db, current_user.id),
+        media_type=export.MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="items.{formato}"'},
+    )
+
+# ----------------------------
+# Estadísticas de los items del usuario
+# ----------------------------
+@router.get("/stats", response_model=schemas.ItemStats, dependencies=[Depends(ratelimit.limit("search"))])
+async def item_stats(
+    nombre: Optional[str] = None,
+    min_precio: Optional[float] = None,
+    max_precio: Optional[float] = None,
+    en_stock: Optional[bool] = None,
+    buckets: int = Query(10, ge=1, le=100),
+    db: database.SessionRunner = Depends(sharding.get_item_read_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Conteos, totales de precio e histograma calculados en la base de datos.
+    Acepta los mismos filtros que /items/buscar/.
+    """
+    return await db.run(
+        crud.item_stats, current_user.id,
+        nombre=nombre, min_precio=min_precio, max_precio=max_precio, en_stock=en_stock, buckets=buckets
+    )
 
 # ----------------------------
 # Obtener item por ID (propio usuario)
 # ----------------------------
 @router.get("/{item_id}", response_model=schemas.ItemResponse)
-def get_item(
+async def get_item(
     item_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: database.SessionRunner = Depends(sharding.get_item_read_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
     """
-    Retorna un item específico del usuario logueado.
+    Retorna un item específico del usuario logueado, con su ETag.
+    Con If-None-Match vigente responde 304 consultando solo la versión.
     """
-    item = db.query(models.Item).filter(
-        models.Item.id == item_id,
-        models.Item.owner_id == current_user.id
-    ).first()
+    if request.headers.get("if-none-match"):
+        version = await db.run(crud.get_item_version, current_user.id, item_id)
+        if version is not None:
+            not_modified = http_cache.not_modified(request, etags.item_etag(version))
+            if not_modified is not None:
+                return not_modified
+
+    item = await db.run(crud.get_item, current_user.id, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item no encontrado")
+    response.headers["ETag"] = etags.item_etag(item.version)
+    response.headers["Cache-Control"] = http_cache.CACHE_CONTROL
     return item
 
 # ----------------------------
 # Actualizar item
 # ----------------------------
 @router.put("/{item_id}", response_model=schemas.ItemResponse)
-def update_item(
+async def update_item(
     item_id: int,
     item: schemas.ItemCreate,  # Puedes usar un ItemUpdate si quieres opcional
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
     """
-    Actualiza un item del usuario logueado.
+    Actualiza un item del usuario logueado en una sola sentencia.
+    Con If-Match solo se escribe si la ETag sigue vigente (si no, 412).
     """
-    db_item = db.query(models.Item).filter(
-        models.Item.id == item_id,
-        models.Item.owner_id == current_user.id
-    ).first()
+    versions = etags.parse_if_match(if_match)
+    try:
+        db_item = await db.run(crud.update_item, current_user.id, item_id, item, versions)
+    except crud.VersionConflict:
+        raise HTTPException(status_code=412, detail="El item fue modificado por otra petición")
     if not db_item:
         raise HTTPException(status_code=404, detail="Item no encontrado")
+    response.headers["ETag"] = etags.item_etag(db_item.version)
+    return db_item
 
-    for key, value in item.dict().items():
-        setattr(db_item, key, value)
-    
-    db.commit()
-    db.refresh(db_item)
+# ----------------------------
+# Actualizar item parcialmente
+# ----------------------------
+@router.patch("/{item_id}", response_model=schemas.ItemResponse)
+async def patch_item(
+    item_id: int,
+    item: schemas.ItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Actualiza solo los campos enviados de un item del usuario logueado.
+    Si ningún valor cambia no se escribe nada.
+    """
+    versions = etags.parse_if_match(if_match)
+    try:
+        db_item = await db.run(
+            crud.patch_item, current_user.id, item_id, item.dict(exclude_unset=True), versions
+        )
+    except crud.VersionConflict:
+        raise HTTPException(status_code=412, detail="El item fue modificado por otra petición")
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Item no encontrado")
+    response.headers["ETag"] = etags.item_etag(db_item.version)
     return db_item
 
 # ----------------------------
 # Eliminar item
 # ----------------------------
 @router.delete("/{item_id}")
-def delete_item(
+async def delete_item(
     item_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    db: database.SessionRunner = Depends(sharding.get_item_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
     """
-    Elimina un item del usuario logueado.
+    Elimina un item del usuario logueado en una sola sentencia.
+    Con If-Match solo se borra si la ETag sigue vigente (si no, 412).
     """
-    db_item = db.query(models.Item).filter(
-        models.Item.id == item_id,
-        models.Item.owner_id == current_user.id
-    ).first()
-    if not db_item:
+    versions = etags.parse_if_match(if_match)
+    try:
+        deleted = await db.run(crud.delete_item, current_user.id, item_id, versions)
+    except crud.VersionConflict:
+        raise HTTPException(status_code=412, detail="El item fue modificado por otra petición")
+    if not deleted:
         raise HTTPException(status_code=404, detail="Item no encontrado")
-    
-    db.delete(db_item)
-    db.commit()
     return {"mensaje": "Item eliminado", "item_id": item_id}
 
 # ----------------------------
-# Buscar items por nombre o precio mínimo
+# Buscar items por texto, nombre, precio o stock
 # ----------------------------
-@router.get("/buscar/", response_model=List[schemas.ItemResponse])
-def search_items(
+@router.get("/buscar/", response_model=List[schemas.ItemResponse], dependencies=[Depends(ratelimit.limit("search"))])
+async def search_items(
+    request: Request,
+    q: Optional[str] = None,
     nombre: Optional[str] = None,
     min_precio: Optional[float] = None,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user)
+    max_precio: Optional[float] = None,
+    en_stock: Optional[bool] = None,
+    fields: Optional[str] = Query(
+        None, description="Campos a devolver separados por comas, p. ej. id,nombre (los items solo traen esos campos)"
+    ),
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    sort: SortOption = "id",
+    db: database.SessionRunner = Depends(sharding.get_item_read_runner),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
     """
-    Buscar items del usuario logueado filtrando por nombre y/o precio mínimo.
-    """
-    query = db.query(models.Item).filter(models.Item.owner_id == current_user.id)
-    
-    if nombre:
-        query = query.filter(models.Item.nombre.ilike(f"%{nombre}%"))
-    
-    if min_precio is not None:
-        query = query.filter(models.Item.precio >= min_precio)
-    
-    return query.all()
+    Buscar items del usuario logueado filtrando por nombre, rango de precio y/o stock.
+    Paginado por cursor igual que GET /items/.
+    Con `q` busca en nombre y descripcion y ordena por relevancia (solo la primera página).
+    Con `fields` solo se leen y devuelven esos campos de cada item: el cuerpo se
+    serializa a mano y sale como Response, sin pasar por la validación de ItemResponse
+    (que sigue siendo el esquema documentado de la respuesta completa).
+    """
+    if q and cursor:
+        raise HTTPException(status_code=400, detail="La búsqueda por relevancia no admite cursor")
+    projection = _parse_fields(fields)
+    return await http_cache.cached_list(
+        request, db, current_user.id,
+        lambda: db.run(
+            crud.search_items, current_user.id,
+            nombre=nombre, min_precio=min_precio, max_precio=max_precio, en_stock=en_stock,
+            sort=sort, cursor=cursor, limit=limit, q=q, as_rows=http_cache.FAST_JSON, fields=projection
+        ),
+        projection
+    )
@@ -1,9 +1,10 @@
 # app/routes/users.py
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-from .. import schemas, models, database, auth
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from .. import schemas, models, database, auth, cache, crud, ratelimit
+from ..config import settings
 
 router = APIRouter(
     prefix="/users",
@@ -15,12 +16,52 @@ router = APIRouter(
 # ----------------------------
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+# ----------------------------
+# Caché de usuarios autenticados
+# ----------------------------
+user_cache = cache.Cache(
+    "user",
+    ttl=settings.user_cache_ttl_seconds,
+    max_entries=settings.user_cache_max_entries,
+)
+
+_INVALIDATING_FIELDS = ("is_active", "hashed_password")
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    """
+    Si cambia el estado o la contraseña, el usuario sale de la caché.
+    Se borra al hacer flush y otra vez tras el commit, para que ninguna petición
+    concurrente vuelva a cachear la fila anterior.
+    """
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _INVALIDATING_FIELDS):
+        user_cache.delete(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("invalidated_users", set()).add(target.id)
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    user_cache.delete(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop("invalidated_users", ()):
+        user_cache.delete(user_id)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: database.SessionRunner = Depends(database.get_runner)
+):
     """
     Helper para obtener el usuario actual a partir del JWT.
+    El usuario se sirve desde user_cache y solo se consulta la BD si no está cacheado.
+    La consulta va siempre al primario, nunca a una réplica: una réplica retrasada
+    volvería a cachear un usuario ya desactivado o con la contraseña cambiada.
     """
     try:
-        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        payload = auth.decode_token(token)
         user_id_str: str = payload.get("sub")
         if user_id_str is None:
             raise HTTPException(status_code=401, detail="Token inválido")
@@ -28,53 +69,75 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         # ✅ Convertir de string a int
         user_id = int(user_id_str)
         
-    except JWTError:
+    except auth.JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
     except ValueError:
         raise HTTPException(status_code=401, detail="Token inválido")
     
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=401, detail="Usuario no encontrado")
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        user = schemas.CurrentUser(**cached)
+    else:
+        db_user = await db.run(crud.get_user, user_id)
+        if db_user is None:
+            raise HTTPException(status_code=401, detail="Usuario no encontrado")
+        user = schemas.CurrentUser.model_validate(db_user)
+        user_cache.set(user_id, user.model_dump())
+
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="Usuario inactivo")
     
     return user
 
+# ----------------------------
+# Helper de hashing
+# ----------------------------
+async def _run_hashing(operation):
+    """
+    Espera una operación del pool de bcrypt; si está saturado responde 503.
+    """
+    try:
+        return await operation
+    except auth.HashingPoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, inténtalo de nuevo",
+            headers={"Retry-After": "1"}
+        )
+
 # ----------------------------
 # Registro de usuario
 # ----------------------------
-@router.post("/register", response_model=schemas.UserResponse)
-def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+@router.post("/register", response_model=schemas.UserResponse, dependencies=[Depends(ratelimit.limit("register"))])
+async def register_user(user: schemas.UserCreate, db: database.SessionRunner = Depends(database.get_runner)):
     
     """
     Registrar un nuevo usuario.
-    Hashea la contraseña y guarda en la BD.
+    Hashea la contraseña (en el pool de bcrypt) y guarda en la BD.
     """
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
+    existing_user = await db.run(crud.get_user_by_email, user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email ya registrado")
     
-    hashed_password = auth.hash_password(user.password)
-    db_user = models.User(email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
+    hashed_password = await _run_hashing(auth.hash_password_async(user.password))
+    return await db.run(crud.create_user, user.email, hashed_password)
 
 # ----------------------------
 # Login
 # ----------------------------
-@router.post("/login")
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+@router.post("/login", dependencies=[Depends(ratelimit.limit("login"))])
+async def login_user(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: database.SessionRunner = Depends(database.get_runner)
+):
     """
     Login de usuario.
-    Verifica contraseña y devuelve JWT.
+    Verifica contraseña (en el pool de bcrypt) y devuelve JWT.
     """
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    user = await db.run(crud.get_user_by_email, form_data.username)
+    if not user or not await _run_hashing(auth.verify_password_async(form_data.password, user.hashed_password)):
         raise HTTPException(status_code=400, detail="Usuario o contraseña incorrectos")
     
     # ✅ Convertir user.id a string
     access_token = auth.create_access_token({"sub": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
-
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import List, Optional
 
 # -----------------------------
 # USUARIO
@@ -15,6 +15,17 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CurrentUser(BaseModel):
+    """
+    Usuario autenticado tal como lo ven los endpoints (y como se guarda en caché).
+    """
+    id: int
+    email: str
+    is_active: bool = True
+
+    class Config:
+        from_attributes = True
+
 # -----------------------------
 # ITEM
 # -----------------------------
@@ -24,6 +35,22 @@ class ItemCreate(BaseModel):
     precio: float
     en_stock: bool = True
 
+class ItemUpdate(BaseModel):
+    """
+    Actualización parcial: solo se escriben los campos enviados (exclude_unset).
+    """
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    precio: Optional[float] = None
+    en_stock: Optional[bool] = None
+
+    @field_validator("nombre", "precio", "en_stock")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("no puede ser null")
+        return value
+
 class ItemResponse(BaseModel):
     id: int
     nombre: str
@@ -31,6 +58,41 @@ class ItemResponse(BaseModel):
     precio: float
     en_stock: bool
     owner_id: int
+    version: int = 1
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ItemBulkUpdate(ItemCreate):
+    id: int
+
+# -----------------------------
+# OPERACIONES MASIVAS
+# -----------------------------
+class BulkItemResult(BaseModel):
+    indice: int
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    exitosos: int
+    fallidos: int
+    resultados: List[BulkItemResult]
+
+# -----------------------------
+# ESTADÍSTICAS
+# -----------------------------
+class PriceBucket(BaseModel):
+    desde: float
+    hasta: float
+    cantidad: int
+
+class ItemStats(BaseModel):
+    total: int
+    en_stock: int
+    precio_total: float
+    precio_promedio: Optional[float] = None
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+    histograma: List[PriceBucket]
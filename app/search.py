@@ -0,0 +1,69 @@
+# app/search.py
+# Búsqueda de texto sobre items, según el motor:
+#   - PostgreSQL: ILIKE apoyado en los índices GIN de pg_trgm, ranking por similarity()
+#   - SQLite: tabla FTS5 (tokenizer trigram), ranking por bm25
+#   - otros: ILIKE sin ranking
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, or_, select, text
+from sqlalchemy.orm import Query, Session
+from . import models
+
+# El tokenizer trigram de FTS5 necesita al menos 3 caracteres para buscar
+MIN_TRIGRAM_LENGTH = 3
+
+# Tabla virtual creada por el DDL de models.SEARCH_DDL (fuera de Base.metadata)
+items_fts = Table(
+    "items_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("nombre", String),
+    Column("descripcion", String),
+    Column("rank"),
+)
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+def _use_fts(db: Session, texto: str) -> bool:
+    return _dialect(db) == "sqlite" and len(texto) >= MIN_TRIGRAM_LENGTH
+
+def _fts_match(texto: str, column: str = None):
+    """
+    Expresión MATCH que busca el texto como subcadena (frase entre comillas).
+    """
+    phrase = '"' + texto.replace('"', '""') + '"'
+    if column:
+        phrase = f"{column} : {phrase}"
+    return text("items_fts MATCH :fts_query").bindparams(fts_query=phrase)
+
+def contains(db: Session, query: Query, column, texto: str) -> Query:
+    """
+    Filtra las filas cuya columna contiene el texto, sin distinguir mayúsculas.
+    """
+    if _use_fts(db, texto):
+        matches = select(items_fts.c.rowid).where(_fts_match(texto, column.key))
+        return query.filter(models.Item.id.in_(matches))
+    return query.filter(column.ilike(f"%{texto}%"))
+
+def ranked(db: Session, query: Query, texto: str) -> Query:
+    """
+    Filtra por texto en nombre o descripcion y ordena por relevancia (mejor primero).
+    """
+    if _use_fts(db, texto):
+        return (
+            query.join(items_fts, items_fts.c.rowid == models.Item.id)
+            .filter(_fts_match(texto))
+            .order_by(items_fts.c.rank, models.Item.id)
+        )
+
+    pattern = f"%{texto}%"
+    query = query.filter(or_(
+        models.Item.nombre.ilike(pattern),
+        models.Item.descripcion.ilike(pattern)
+    ))
+    if _dialect(db) == "postgresql":
+        relevance = func.greatest(
+            func.similarity(models.Item.nombre, texto),
+            func.similarity(func.coalesce(models.Item.descripcion, ""), texto)
+        )
+        return query.order_by(relevance.desc(), models.Item.id)
+    return query.order_by(models.Item.id)
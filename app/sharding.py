@@ -0,0 +1,371 @@
+# app/sharding.py
+# Sharding de items por owner_id (SHARD_URLS):
+#   - users, el directorio de shards y el contador de ids siguen en DATABASE_URL
+#   - items y owner_versions de cada usuario viven en un shard:
+#       hash  -> owner_id % número de shards
+#       range -> SHARD_RANGES=1000,5000: owner_id < 1000 al 0, < 5000 al 1, resto al 2
+#   - shard_directory (en el primario) guarda las excepciones que crea el rebalanceo
+#   - los ids de items los reparte un contador global en bloques, así no se repiten entre
+#     shards y un usuario se puede mover sin renumerar sus items
+# Sin SHARD_URLS todo sigue en DATABASE_URL y las dependencias devuelven el runner de siempre.
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import create_engine, delete, exc, inspect, insert, make_url, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from . import cache, database, models, replicas, schemas
+from .config import settings
+from .routes.users import get_current_user
+
+SHARD_URLS = [url.strip() for url in settings.shard_urls.split(",") if url.strip()]
+SHARD_STRATEGY = settings.shard_strategy
+SHARD_RANGES = [int(bound) for bound in settings.shard_ranges.split(",") if bound.strip()]
+SHARD_DIRECTORY_TTL_SECONDS = settings.shard_directory_ttl_seconds
+SHARD_ID_BLOCK_SIZE = settings.shard_id_block_size
+
+STRATEGIES = ("hash", "range")
+# Items copiados por consulta al rebalancear
+REBALANCE_CHUNK_SIZE = 1000
+# Tablas que viven en cada shard; se crean sin las FK a users (que está en el primario)
+SHARD_TABLES = (models.Item.__table__, models.OwnerVersion.__table__)
+
+logger = logging.getLogger("app.sharding")
+
+# ----------------------------
+# Mapa de shards
+# ----------------------------
+class ShardMap:
+    def __init__(self, count: int, strategy: str = "hash", ranges: List[int] = ()):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"SHARD_STRATEGY debe ser uno de {STRATEGIES}")
+        if strategy == "range" and (len(ranges) != count - 1 or list(ranges) != sorted(ranges)):
+            raise ValueError("SHARD_RANGES necesita número de shards - 1 límites crecientes")
+        self.count = count
+        self.strategy = strategy
+        self.ranges = list(ranges)
+
+    def shard_for(self, owner_id: int) -> int:
+        if self.strategy == "range":
+            return bisect.bisect_right(self.ranges, owner_id)
+        return owner_id % self.count
+
+# ----------------------------
+# Ids de items
+# ----------------------------
+def primary_engine():
+    """
+    Engine del primario para reservar bloques de ids. Con DB_ASYNC es el sync_engine del
+    engine asíncrono: la reserva se hace dentro de AsyncSession.run_sync con el driver
+    asíncrono, sin bloquear el event loop ni crear un engine síncrono aparte.
+    """
+    if database.DB_ASYNC:
+        return database.get_async_engine().sync_engine
+    return database.get_engine()
+
+class IdAllocator:
+    """
+    Reserva bloques de `block_size` ids en la tabla item_ids del primario (una
+    transacción corta por bloque) y los reparte desde memoria.
+    """
+    def __init__(self, block_size: int, engine: Callable = primary_engine):
+        self.block_size = block_size
+        self.engine = engine
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, count: int) -> int:
+        counter = models.ItemIdCounter.__table__
+        engine = self.engine()
+        for _ in range(3):
+            with engine.begin() as conn:
+                start = conn.execute(
+                    update(counter).where(counter.c.id == 1)
+                    .values(next_id=counter.c.next_id + count)
+                    .returning(counter.c.next_id - count)
+                ).scalar()
+            if start is not None:
+                return start
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(counter).values(id=1, next_id=1 + count))
+                return 1
+            except exc.IntegrityError:
+                continue  # otro proceso creó la fila a la vez
+        raise RuntimeError("No se pudo reservar un bloque de ids de items")
+
+    def _take(self, count: int) -> List[int]:
+        take = min(count, self._end - self._next)
+        ids = list(range(self._next, self._next + take))
+        self._next += take
+        return ids
+
+    def allocate(self, count: int) -> List[int]:
+        with self._lock:
+            ids = self._take(count)
+        while len(ids) < count:
+            # La reserva va fuera del lock: en modo asíncrono cede el event loop a otras
+            # peticiones, que no pueden quedarse bloqueadas en un threading.Lock.
+            # Si dos reservan a la vez, el resto del bloque que se descarta solo deja huecos.
+            size = max(self.block_size, count - len(ids))
+            start = self._reserve(size)
+            with self._lock:
+                self._next, self._end = start, start + size
+                ids += self._take(count - len(ids))
+        return ids
+
+# ----------------------------
+# Shards
+# ----------------------------
+class Shard:
+    def __init__(self, index: int, url: str, allocator: IdAllocator):
+        self.index = index
+        self.url = url
+        self.allocator = allocator
+        self.sessions_opened = 0
+        self._engine = None
+        self._sessions = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return make_url(self.url).render_as_string(hide_password=True)
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine, self._sessions = database.create_node(
+                        self.url, info={"allocate_item_ids": self.allocator.allocate}
+                    )
+        return self._engine
+
+    def runner(self) -> database.SessionRunner:
+        self.engine
+        self.sessions_opened += 1
+        session = self._sessions()
+        return database.AsyncRunner(session) if database.DB_ASYNC else database.SyncRunner(session)
+
+    def dispose(self, close: bool = True) -> None:
+        engine, self._engine = self._engine, None
+        if engine is not None:
+            getattr(engine, "sync_engine", engine).dispose(close=close)
+
+class ShardSet:
+    def __init__(self, urls: List[str], shard_map: ShardMap, allocator: IdAllocator):
+        self.map = shard_map
+        self.allocator = allocator
+        self.shards = [Shard(index, url, allocator) for index, url in enumerate(urls)]
+        self.directory = cache.Cache("shard", ttl=SHARD_DIRECTORY_TTL_SECONDS, max_entries=100000)
+
+    def __bool__(self) -> bool:
+        return bool(self.shards)
+
+    def lookup(self, db: Session, owner_id: int) -> Optional[int]:
+        """
+        Shard del usuario (None mientras el rebalanceo lo mueve). Se consulta con una
+        sesión del primario y se cachea SHARD_DIRECTORY_TTL_SECONDS; el estado "moviéndose"
+        no se cachea, para servir el shard nuevo en cuanto el rebalanceo termine.
+        """
+        cached = self.directory.get(owner_id)
+        if cached is not None:
+            return cached["shard"]
+        row = db.execute(
+            select(models.ShardDirectory.shard).where(models.ShardDirectory.owner_id == owner_id)
+        ).first()
+        shard = row.shard if row is not None else self.map.shard_for(owner_id)
+        if shard is not None:
+            self.directory.set(owner_id, {"shard": shard})
+        return shard
+
+    def dispose(self, close: bool = True) -> None:
+        for shard in self.shards:
+            shard.dispose(close)
+
+    def stats(self) -> dict:
+        return {
+            "shards": len(self.shards),
+            "strategy": self.map.strategy,
+            "directory_hits": self.directory.hits,
+            "directory_misses": self.directory.misses,
+            "nodes": [{"url": shard.name, "sessions": shard.sessions_opened} for shard in self.shards],
+        }
+
+shards = ShardSet(
+    SHARD_URLS,
+    ShardMap(len(SHARD_URLS) or 1, SHARD_STRATEGY, SHARD_RANGES),
+    IdAllocator(SHARD_ID_BLOCK_SIZE),
+)
+
+# ----------------------------
+# Dependencias
+# ----------------------------
+async def owner_shard(owner_id: int, primary: database.SessionRunner) -> Optional[int]:
+    """
+    Índice del shard del usuario (None sin sharding); 503 si el rebalanceo lo está moviendo.
+    """
+    if not shards:
+        return None
+    index = await primary.run(shards.lookup, owner_id)
+    if index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Los items de este usuario se están moviendo de shard",
+            headers={"Retry-After": str(max(1, int(SHARD_DIRECTORY_TTL_SECONDS)))}
+        )
+    return index
+
+def open_runner(index: Optional[int]) -> database.SessionRunner:
+    """
+    Runner nuevo sobre el shard `index` (o el primario si es None); hay que cerrarlo.
+    """
+    return database.open_runner() if index is None else shards.shards[index].runner()
+
+async def _shard_runner(owner_id: int, primary: database.SessionRunner) -> database.SessionRunner:
+    return shards.shards[await owner_shard(owner_id, primary)].runner()
+
+async def get_item_runner(
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    primary: database.SessionRunner = Depends(database.get_runner)
+):
+    """
+    Runner para leer y escribir los items del usuario actual: su shard, o el primario sin sharding.
+    """
+    if not shards:
+        yield primary
+        return
+    runner = await _shard_runner(current_user.id, primary)
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
+async def get_item_read_runner(
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    primary: database.SessionRunner = Depends(database.get_runner),
+    read: database.SessionRunner = Depends(replicas.get_read_runner)
+):
+    """
+    Como get_item_runner, pero sin sharding lee de una réplica (replicas.get_read_runner).
+    """
+    if not shards:
+        yield read
+        return
+    runner = await _shard_runner(current_user.id, primary)
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
+# ----------------------------
+# Herramientas offline (python -m app init-shards / rebalance)
+# ----------------------------
+def init_shard_schema(engine) -> List[str]:
+    """
+    Crea items y owner_versions (sin FK a users, con sus índices y los de búsqueda) si no existen.
+    Retorna las tablas creadas.
+    """
+    created = []
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for table in SHARD_TABLES:
+            if table.name in existing:
+                continue
+            conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+            for index in table.indexes:
+                conn.execute(CreateIndex(index))
+            if table is models.Item.__table__:
+                for statement in models.SEARCH_DDL.get(conn.dialect.name, ()):
+                    conn.exec_driver_sql(statement)
+            created.append(table.name)
+    return created
+
+def _set_directory(conn, owner_id: int, shard: Optional[int]) -> None:
+    directory = models.ShardDirectory.__table__
+    conn.execute(delete(directory).where(directory.c.owner_id == owner_id))
+    conn.execute(insert(directory).values(owner_id=owner_id, shard=shard))
+
+def rebalance(
+    owner_id: int,
+    target: int,
+    wait: Optional[float] = None,
+    primary_url: Optional[str] = None,
+    shard_urls: Optional[List[str]] = None,
+    shard_map: Optional[ShardMap] = None,
+) -> int:
+    """
+    Mueve los items (y el contador owner_versions) de un usuario al shard `target`:
+      1. marca al usuario como "moviéndose" en shard_directory (sus peticiones de items reciben 503)
+      2. espera `wait` segundos (por defecto SHARD_DIRECTORY_TTL_SECONDS) a que caduquen las cachés
+         del directorio en los workers
+      3. copia las filas al destino en una transacción (borrando restos de un intento anterior)
+      4. apunta el directorio al destino y borra las filas del origen
+    Si la copia falla, el directorio vuelve al origen. Retorna el número de items movidos.
+    """
+    shard_urls = shard_urls or SHARD_URLS
+    shard_map = shard_map or shards.map
+    wait = SHARD_DIRECTORY_TTL_SECONDS if wait is None else wait
+    if not 0 <= target < len(shard_urls):
+        raise ValueError(f"Shard destino fuera de rango (0..{len(shard_urls) - 1})")
+
+    items = models.Item.__table__
+    versions = models.OwnerVersion.__table__
+    directory = models.ShardDirectory.__table__
+    primary = create_engine(primary_url or database.DATABASE_URL)
+    engines = [create_engine(url) for url in shard_urls]
+    try:
+        with primary.begin() as conn:
+            row = conn.execute(select(directory.c.shard).where(directory.c.owner_id == owner_id)).first()
+            if row is not None and row.shard is None:
+                raise RuntimeError(f"El usuario {owner_id} ya se está moviendo")
+            source = row.shard if row is not None else shard_map.shard_for(owner_id)
+            if source == target:
+                return 0
+            _set_directory(conn, owner_id, None)
+        time.sleep(wait)
+
+        moved = 0
+        try:
+            with engines[source].connect() as src, engines[target].begin() as dst:
+                dst.execute(delete(items).where(items.c.owner_id == owner_id))
+                dst.execute(delete(versions).where(versions.c.owner_id == owner_id))
+                # Por bloques de REBALANCE_CHUNK_SIZE ids (keyset): la memoria no crece con el usuario
+                last_id = 0
+                while True:
+                    chunk = [dict(r._mapping) for r in src.execute(
+                        select(items)
+                        .where(items.c.owner_id == owner_id, items.c.id > last_id)
+                        .order_by(items.c.id)
+                        .limit(REBALANCE_CHUNK_SIZE)
+                    )]
+                    if not chunk:
+                        break
+                    dst.execute(insert(items), chunk)
+                    moved += len(chunk)
+                    last_id = chunk[-1]["id"]
+                version = src.execute(select(versions.c.version).where(versions.c.owner_id == owner_id)).scalar()
+                # Versión nueva: las ETags y listados cacheados del usuario dejan de valer
+                dst.execute(insert(versions).values(owner_id=owner_id, version=(version or 0) + 1))
+        except Exception:
+            with primary.begin() as conn:
+                _set_directory(conn, owner_id, source)
+            raise
+
+        with primary.begin() as conn:
+            _set_directory(conn, owner_id, target)
+        with engines[source].begin() as src:
+            src.execute(delete(items).where(items.c.owner_id == owner_id))
+            src.execute(delete(versions).where(versions.c.owner_id == owner_id))
+        logger.info("Usuario %s movido del shard %s al %s (%s items)", owner_id, source, target, moved)
+        return moved
+    finally:
+        primary.dispose()
+        for engine in engines:
+            engine.dispose()
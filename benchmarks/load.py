@@ -0,0 +1,372 @@
+# benchmarks/load.py
+"""
+Prueba de carga reproducible de la API: siembra N usuarios con M items cada uno y lanza
+una mezcla de operaciones con C clientes concurrentes, dentro del proceso (ASGI) o
+contra uvicorn. Informa throughput y percentiles de latencia por operación y puede
+guardar/comparar resultados JSON entre commits.
+
+Uso:
+    python -m benchmarks.load --mix lectura --concurrency 20 --duration 15
+    python -m benchmarks.load --mode uvicorn --workers 4 --mix mixta --json actual.json
+    python -m benchmarks.load --mix mixta --json actual.json --compare base.json --max-regression 0.15
+
+Mezclas: lectura, escritura, auth, lote, mixta; o una sola operación
+(register, login, list, search, get, create, update, delete, bulk).
+
+La BD indicada con --url debe estar vacía: se crea el esquema y se llena con datos de prueba.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PASSWORD = "benchpassword"
+
+# Pesos de cada operación por mezcla
+MIXES = {
+    "lectura": {"list": 50, "search": 30, "get": 20},
+    "escritura": {"create": 40, "update": 40, "delete": 20},
+    "auth": {"login": 70, "register": 30},
+    "lote": {"bulk": 100},
+    "mixta": {"list": 35, "search": 20, "get": 20, "create": 10, "update": 10, "delete": 3, "login": 2},
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+# ----------------------------
+# Datos de prueba
+# ----------------------------
+def seed(url: str, users: int, items_per_user: int) -> List[dict]:
+    """
+    Crea el esquema y siembra los datos; retorna [{"id", "email", "token", "items"}].
+    Todos los usuarios comparten contraseña, así que bcrypt se ejecuta una sola vez.
+    """
+    from sqlalchemy import create_engine, insert
+    from app import auth, models
+    from app.database import Base
+
+    rng = random.Random(42)
+    hashed = auth.hash_password(PASSWORD)
+    engine = create_engine(url)
+    try:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            user_ids = connection.scalars(
+                insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+                [{"email": f"bench{n}@example.com", "hashed_password": hashed, "is_active": True}
+                 for n in range(users)]
+            ).all()
+            accounts = []
+            for n, user_id in enumerate(user_ids):
+                item_ids = connection.scalars(
+                    insert(models.Item).returning(models.Item.id, sort_by_parameter_order=True),
+                    [{
+                        "nombre": f"Producto {rng.randrange(100000)}",
+                        "descripcion": rng.choice([None, "cable usb", "pantalla", "teclado"]),
+                        "precio": round(rng.uniform(1, 2000), 2),
+                        "en_stock": rng.random() < 0.8,
+                        "owner_id": user_id,
+                    } for _ in range(items_per_user)]
+                ).all() if items_per_user else []
+                accounts.append({
+                    "id": user_id,
+                    "email": f"bench{n}@example.com",
+                    "token": auth.create_access_token({"sub": str(user_id)}),
+                    "items": list(item_ids),
+                })
+    finally:
+        engine.dispose()
+    return accounts
+
+# ----------------------------
+# Operaciones
+# ----------------------------
+def _item_payload(rng: random.Random) -> dict:
+    return {
+        "nombre": f"Bench {rng.randrange(100000)}",
+        "descripcion": "creado por benchmarks.load",
+        "precio": round(rng.uniform(1, 2000), 2),
+        "en_stock": True,
+    }
+
+async def op_register(client, account, rng):
+    email = f"nuevo-{time.monotonic_ns()}-{rng.randrange(10**6)}@example.com"
+    return await client.post("/users/register", json={"email": email, "password": PASSWORD})
+
+async def op_login(client, account, rng):
+    return await client.post("/users/login", data={"username": account["email"], "password": PASSWORD})
+
+async def op_list(client, account, rng):
+    return await client.get("/items/", params={"limit": 50, "sort": rng.choice(["id", "precio"])}, headers=account["headers"])
+
+async def op_search(client, account, rng):
+    params = rng.choice([
+        {"q": "usb"},
+        {"nombre": "Producto 1", "min_precio": 100},
+        {"min_precio": 500, "max_precio": 1500, "sort": "-precio"},
+    ])
+    return await client.get("/items/buscar/", params=dict(params, limit=50), headers=account["headers"])
+
+async def op_get(client, account, rng):
+    item_id = rng.choice(account["items"]) if account["items"] else 0
+    return await client.get(f"/items/{item_id}", headers=account["headers"])
+
+async def op_create(client, account, rng):
+    response = await client.post("/items/", json=_item_payload(rng), headers=account["headers"])
+    if response.status_code == 200:
+        account["items"].append(response.json()["id"])
+    return response
+
+async def op_update(client, account, rng):
+    item_id = rng.choice(account["items"]) if account["items"] else 0
+    return await client.put(f"/items/{item_id}", json=_item_payload(rng), headers=account["headers"])
+
+async def op_delete(client, account, rng):
+    if not account["items"]:
+        return await op_create(client, account, rng)
+    item_id = account["items"].pop(rng.randrange(len(account["items"])))
+    return await client.delete(f"/items/{item_id}", headers=account["headers"])
+
+async def op_bulk(client, account, rng):
+    return await client.post("/items/bulk", json=[_item_payload(rng) for _ in range(100)], headers=account["headers"])
+
+OPERATIONS = {
+    "register": op_register,
+    "login": op_login,
+    "list": op_list,
+    "search": op_search,
+    "get": op_get,
+    "create": op_create,
+    "update": op_update,
+    "delete": op_delete,
+    "bulk": op_bulk,
+}
+
+# ----------------------------
+# Ejecución
+# ----------------------------
+def percentile(values: List[float], p: float) -> float:
+    """
+    Percentil por rango más cercano (values ya ordenados).
+    """
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> dict:
+    operations = {}
+    for name, values in sorted(latencies.items()):
+        values = sorted(values)
+        operations[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": len(values) / elapsed if elapsed else 0.0,
+            "mean_ms": sum(values) / len(values) if values else 0.0,
+            **{f"p{p}_ms": percentile(values, p) for p in PERCENTILES},
+            "max_ms": values[-1] if values else 0.0,
+        }
+    total = sum(op["requests"] for op in operations.values())
+    all_values = sorted(v for values in latencies.values() for v in values)
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "errors": sum(errors.values()),
+        "rps": total / elapsed if elapsed else 0.0,
+        **{f"p{p}_ms": percentile(all_values, p) for p in PERCENTILES},
+        "operations": operations,
+    }
+
+async def drive(
+    client: httpx.AsyncClient,
+    accounts: List[dict],
+    weights: Dict[str, int],
+    concurrency: int,
+    duration: Optional[float],
+    requests: Optional[int],
+    seed_value: int = 42,
+) -> dict:
+    """
+    Lanza `concurrency` clientes que eligen operaciones según `weights` hasta agotar
+    `requests` peticiones o `duration` segundos.
+    """
+    for account in accounts:
+        account["headers"] = {"Authorization": f"Bearer {account['token']}"}
+    names, cumulative = list(weights), list(weights.values())
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {}
+    remaining = [requests if requests is not None else float("inf")]
+    deadline = time.perf_counter() + duration if duration else float("inf")
+
+    async def worker(index: int):
+        rng = random.Random(seed_value + index)
+        while remaining[0] > 0 and time.perf_counter() < deadline:
+            remaining[0] -= 1
+            name = rng.choices(names, weights=cumulative)[0]
+            account = rng.choice(accounts)
+            start = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](client, account, rng)
+                failed = response.status_code >= 400 and not (name in ("get", "update") and response.status_code == 404)
+            except httpx.HTTPError:
+                failed = True
+            latencies[name].append((time.perf_counter() - start) * 1000)
+            if failed:
+                errors[name] = errors.get(name, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def run_inprocess(accounts, weights, concurrency, duration, requests) -> dict:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await drive(client, accounts, weights, concurrency, duration, requests)
+
+async def run_http(base_url, accounts, weights, concurrency, duration, requests) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        return await drive(client, accounts, weights, concurrency, duration, requests)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_uvicorn(workers: int) -> tuple:
+    """
+    Arranca uvicorn con el entorno actual (DATABASE_URL ya apunta a la BD sembrada).
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=os.environ.copy()
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn no arrancó en 30 s")
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """
+    Compara p95 y throughput por operación; retorna las regresiones por encima del umbral.
+    """
+    regressions = []
+    print(f"\n{'operación':<10} {'p95 base':>10} {'p95 actual':>11} {'Δ':>8} {'rps base':>10} {'rps actual':>11}")
+    for name, now in current["operations"].items():
+        before = baseline["operations"].get(name)
+        if not before:
+            continue
+        delta = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        print(f"{name:<10} {before['p95_ms']:>10.2f} {now['p95_ms']:>11.2f} {delta:>+8.1%} "
+              f"{before['rps']:>10.1f} {now['rps']:>11.1f}")
+        if delta > max_regression:
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms ({delta:+.1%})")
+    return regressions
+
+def print_report(results: dict) -> None:
+    summary = results["summary"]
+    print(f"{results['params']['mode']} · mezcla {results['params']['mix']} · "
+          f"{results['params']['concurrency']} clientes · {summary['requests']} peticiones "
+          f"en {summary['elapsed_s']:.1f} s · {summary['rps']:.1f} req/s · {summary['errors']} errores")
+    print(f"{'operación':<10} {'n':>7} {'err':>5} {'req/s':>8} " + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES) + f" {'max':>8}")
+    for name, op in summary["operations"].items():
+        print(f"{name:<10} {op['requests']:>7} {op['errors']:>5} {op['rps']:>8.1f} "
+              + " ".join(f"{op[f'p{p}_ms']:>8.2f}" for p in PERCENTILES) + f" {op['max_ms']:>8.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="BD vacía a usar (por defecto, un SQLite temporal)")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="procesos de uvicorn (--mode uvicorn)")
+    parser.add_argument("--mix", choices=list(MIXES) + list(OPERATIONS), default="mixta")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--items", type=int, default=200, help="items por usuario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos (si no se indica --requests)")
+    parser.add_argument("--requests", type=int, help="número total de peticiones")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="mantener los límites por usuario/IP (por defecto se desactivan)")
+    parser.add_argument("--json", help="guardar los resultados en este fichero")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="aumento de p95 tolerado al comparar (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    weights = MIXES.get(args.mix, {args.mix: 1})
+    duration = None if args.requests else args.duration
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        # La app lee DATABASE_URL al importarse (en este proceso o en uvicorn)
+        os.environ["DATABASE_URL"] = url
+        if not args.rate_limit:
+            # Todos los clientes de la prueba comparten IP y unos pocos usuarios
+            os.environ["RATE_LIMIT_ENABLED"] = "false"
+        accounts = seed(url, args.users, args.items)
+
+        if args.mode == "inprocess":
+            summary = asyncio.run(run_inprocess(accounts, weights, args.concurrency, duration, args.requests))
+        else:
+            process, base_url = start_uvicorn(args.workers)
+            try:
+                summary = asyncio.run(run_http(base_url, accounts, weights, args.concurrency, duration, args.requests))
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+
+    results = {
+        "commit": _git_commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            "mode": args.mode, "workers": args.workers, "mix": args.mix, "users": args.users,
+            "items_per_user": args.items, "concurrency": args.concurrency,
+            "duration": duration, "requests": args.requests,
+            "database": url.split(":", 1)[0], "rate_limit": args.rate_limit,
+        },
+        "summary": summary,
+    }
+    print_report(results)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(summary, baseline["summary"], args.max_regression)
+        if regressions:
+            print("\nRegresiones:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/owner_indexes.py
+"""
+Compara planes de consulta y latencias de los accesos por owner_id
+antes (revisión 0002) y después (head) de los índices compuestos.
+
+Uso:
+    python -m benchmarks.owner_indexes --users 50 --items 2000
+    python -m benchmarks.owner_indexes --url postgresql://.../bench_db --json resultados.json
+
+La BD indicada con --url debe estar vacía: se crea el esquema y se llena con datos de prueba.
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+import sqlalchemy as sa
+from sqlalchemy import create_engine, insert, text
+
+ROOT = Path(__file__).resolve().parent.parent
+
+QUERIES = {
+    "listar": "SELECT * FROM items WHERE owner_id = :owner ORDER BY id LIMIT 100",
+    "listar_por_precio": (
+        "SELECT * FROM items WHERE owner_id = :owner AND precio >= :precio "
+        "ORDER BY precio, id LIMIT 100"
+    ),
+    "listar_por_nombre": "SELECT * FROM items WHERE owner_id = :owner ORDER BY nombre, id LIMIT 100",
+    "contar": "SELECT count(*) FROM items WHERE owner_id = :owner",
+}
+
+# Tablas tal como quedan en la revisión 0002 (la que se siembra): los modelos ORM siguen
+# el esquema de head y las columnas añadidas después (p. ej. items.version) aún no existen
+USERS_0002 = sa.table(
+    "users", sa.column("id"), sa.column("email"), sa.column("hashed_password"), sa.column("is_active")
+)
+ITEMS_0002 = sa.table(
+    "items", sa.column("nombre"), sa.column("descripcion"), sa.column("precio"),
+    sa.column("en_stock"), sa.column("owner_id")
+)
+
+def _migrate(engine, revision: str) -> None:
+    with engine.begin() as connection:
+        config = Config(str(ROOT / "alembic.ini"))
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+def _seed(engine, users: int, items_per_user: int) -> None:
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(insert(USERS_0002), [
+            {"id": user_id, "email": f"bench{user_id}@example.com", "hashed_password": "x", "is_active": True}
+            for user_id in range(1, users + 1)
+        ])
+        # Filas intercaladas entre usuarios, como llegan en producción
+        rows = [
+            {
+                "nombre": f"Producto {rng.randrange(100000)}",
+                "descripcion": None,
+                "precio": round(rng.uniform(1, 2000), 2),
+                "en_stock": True,
+                "owner_id": user_id,
+            }
+            for _ in range(items_per_user)
+            for user_id in range(1, users + 1)
+        ]
+        for start in range(0, len(rows), 5000):
+            connection.execute(insert(ITEMS_0002), rows[start:start + 5000])
+
+def _analyze(engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+def _explain(connection, sql: str, params: dict) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    rows = connection.execute(text(prefix + sql), params)
+    return " / ".join(str(row[-1]) for row in rows)
+
+def _measure(engine, users: int, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            params = {"owner": users // 2 or 1, "precio": 1000}
+            plan = _explain(connection, sql, params)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                connection.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {"plan": plan, "median_ms": statistics.median(timings)}
+    return results
+
+def run(url: str, users: int, items_per_user: int, repeat: int) -> dict:
+    engine = create_engine(url)
+    try:
+        _migrate(engine, "0002")
+        _seed(engine, users, items_per_user)
+        _analyze(engine)
+        before = _measure(engine, users, repeat)
+
+        _migrate(engine, "head")
+        _analyze(engine)
+        after = _measure(engine, users, repeat)
+    finally:
+        engine.dispose()
+    return {"users": users, "items_per_user": items_per_user, "antes": before, "despues": after}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="BD vacía a usar (por defecto, un SQLite temporal)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=2000, help="items por usuario")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        results = run(url, args.users, args.items, args.repeat)
+
+    for name in QUERIES:
+        before, after = results["antes"][name], results["despues"][name]
+        print(f"== {name}")
+        print(f"   antes   {before['median_ms']:8.2f} ms  | {before['plan']}")
+        print(f"   después {after['median_ms']:8.2f} ms  | {after['plan']}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
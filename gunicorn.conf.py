@@ -0,0 +1,37 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py app.main:app   (o: python -m app serve --gunicorn)
+# Con preload_app la app se importa una vez en el maestro y los workers la heredan
+# por fork; cada worker ejecuta después el lifespan (calentamiento) antes de aceptar tráfico.
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+keepalive = 5
+graceful_timeout = 30
+accesslog = None
+
+# Métricas de todos los workers en /metrics: prometheus_client escribe los valores de cada
+# proceso en este directorio. Se fija antes de que preload_app importe la app y se vacía
+# en cada arranque para no sumar procesos de una ejecución anterior.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "app-prometheus")
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el maestro no se pueden compartir entre procesos
+    from app import database, replicas, sharding
+    database.dispose_after_fork()
+    replicas.replicas.dispose(close=False)
+    sharding.shards.dispose(close=False)
+
+def child_exit(server, worker):
+    # Las peticiones en curso (gauge livesum) de un worker muerto dejan de contar
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
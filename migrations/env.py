@@ -0,0 +1,62 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app import models  # noqa: F401  (registra las tablas en Base.metadata)
+from app.database import Base, DATABASE_URL
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+def include_name(name, type_, parent_names):
+    """
+    La tabla FTS5 (y sus tablas internas) se crea con DDL propio, fuera del metadata.
+    """
+    if type_ == "table":
+        return not name.startswith("items_fts")
+    return True
+
+def get_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+def run_migrations_offline():
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # Permite pasar una conexión ya abierta (tests, benchmarks)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    engine = create_engine(get_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
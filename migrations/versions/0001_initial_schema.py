@@ -0,0 +1,45 @@
+"""Esquema inicial: users e items
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Equivale a lo que creaba Base.metadata.create_all antes de las migraciones.
+Una BD existente creada así se marca con `alembic stamp 0001` antes de `alembic upgrade head`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("nombre", sa.String(), nullable=True),
+        sa.Column("descripcion", sa.String(), nullable=True),
+        sa.Column("precio", sa.Float(), nullable=True),
+        sa.Column("en_stock", sa.Boolean(), nullable=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+    )
+    op.create_index("ix_items_id", "items", ["id"])
+    op.create_index("ix_items_nombre", "items", ["nombre"])
+
+
+def downgrade():
+    op.drop_table("items")
+    op.drop_table("users")
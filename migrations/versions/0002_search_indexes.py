@@ -0,0 +1,67 @@
+"""Índices de búsqueda de texto en items (pg_trgm / FTS5)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    "nombre, descripcion, content='items', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, nombre, descripcion) "
+    "VALUES ('delete', old.id, old.nombre, old.descripcion); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF nombre, descripcion ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, nombre, descripcion) "
+    "VALUES ('delete', old.id, old.nombre, old.descripcion); "
+    "INSERT INTO items_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion); "
+    "END",
+    # Indexa las filas que ya existían
+    "INSERT INTO items_fts(items_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS items_fts_au",
+    "DROP TRIGGER IF EXISTS items_fts_ad",
+    "DROP TRIGGER IF EXISTS items_fts_ai",
+    "DROP TABLE IF EXISTS items_fts",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # CONCURRENTLY no puede ir dentro de una transacción
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_nombre_trgm "
+                "ON items USING gin (nombre gin_trgm_ops)"
+            )
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_descripcion_trgm "
+                "ON items USING gin (descripcion gin_trgm_ops)"
+            )
+    elif dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_items_descripcion_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_items_nombre_trgm")
+    elif dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,45 @@
+"""Índices compuestos por owner_id en items
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Todas las consultas de /items filtran primero por owner_id y después por id,
+precio o nombre; sin estos índices listar los items de un usuario recorre la tabla.
+"""
+from contextlib import nullcontext
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_items_owner_id_id": ["owner_id", "id"],
+    "ix_items_owner_id_precio": ["owner_id", "precio"],
+    "ix_items_owner_id_nombre": ["owner_id", "nombre"],
+}
+
+
+def _concurrently():
+    """
+    En PostgreSQL los índices se crean con CONCURRENTLY para no bloquear escrituras,
+    lo que exige ejecutarlos fuera de la transacción de la migración.
+    """
+    if op.get_bind().dialect.name == "postgresql":
+        return op.get_context().autocommit_block()
+    return nullcontext()
+
+
+def upgrade():
+    with _concurrently():
+        for name, columns in INDEXES.items():
+            op.create_index(name, "items", columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with _concurrently():
+        for name in INDEXES:
+            op.drop_index(name, table_name="items", postgresql_concurrently=True)
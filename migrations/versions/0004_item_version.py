@@ -0,0 +1,25 @@
+"""Columna version en items (concurrencia optimista)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "items",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+    )
+
+
+def downgrade():
+    # DROP COLUMN directo (SQLite >= 3.35): recrear la tabla perdería los triggers de items_fts
+    op.drop_column("items", "version")
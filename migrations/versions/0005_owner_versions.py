@@ -0,0 +1,25 @@
+"""Contador de cambios por usuario (owner_versions)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "owner_versions",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    op.drop_table("owner_versions")
@@ -0,0 +1,33 @@
+"""Directorio de shards y contador global de ids de items
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "shard_directory",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("shard", sa.Integer(), nullable=True),
+    )
+    op.create_table(
+        "item_ids",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("next_id", sa.Integer(), nullable=False),
+    )
+    # Los ids que reparta el contador empiezan tras los items que ya existen
+    op.execute("INSERT INTO item_ids (id, next_id) SELECT 1, COALESCE(MAX(id), 0) + 1 FROM items")
+
+
+def downgrade():
+    op.drop_table("item_ids")
+    op.drop_table("shard_directory")
@@ -1,11 +1,12 @@
 # tests/conftest.py
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import Base, get_db
-from app import models
+from app import database, models
 import os
 from dotenv import load_dotenv
 
@@ -20,10 +21,32 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine de la app (pool instrumentado, DB_POOL_*) sobre la misma BD de test: lo usan el
+# calentamiento, /stats y lo que abre sesiones sin pasar por get_db
+app_engine = create_engine(SQLALCHEMY_DATABASE_URL, **database.engine_options(SQLALCHEMY_DATABASE_URL))
+
 # ========================================
 # FIXTURES
 # ========================================
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Las cachés en memoria viven en el proceso; se vacían entre tests
+    porque la BD se recrea y los ids se reutilizan.
+    """
+    from app.auth import token_cache
+    from app.http_cache import response_cache
+    from app.ratelimit import limiter
+    from app.routes.users import user_cache
+    from app.sharding import shards
+    user_cache.clear()
+    shards.directory.clear()
+    token_cache.clear()
+    response_cache.clear()
+    limiter.reset()
+    yield
+
 @pytest.fixture(scope="function")
 def db_session():
     """
@@ -37,8 +60,25 @@ def db_session():
         db.close()
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def test_engine(db_session):
+    """
+    Engine de la BD de test (con el esquema creado), para el código que abre sus propias
+    conexiones en lugar de usar get_db.
+    """
+    return engine
+
+@pytest.fixture
+def app_database(db_session, monkeypatch):
+    """
+    El engine perezoso de app.database apunta a la BD de test, no a DATABASE_URL.
+    """
+    monkeypatch.setattr(database, "_engine", app_engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=app_engine))
+    return app_engine
+
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, app_database):
     """
     Cliente de prueba con BD de test.
     """
@@ -121,4 +161,21 @@ def test_item(db_session, test_user):
     db_session.add(item)
     db_session.commit()
     db_session.refresh(item)
-    return item
\ No newline at end of file
+    return item
+
+@pytest.fixture
+def capture_sql():
+    """
+    Context manager que registra las sentencias SQL ejecutadas en la BD de test.
+    """
+    @contextmanager
+    def capture():
+        statements = []
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    return capture
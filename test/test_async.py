@@ -0,0 +1,70 @@
+# test/test_async.py
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app import database
+from app.main import app
+
+@pytest.fixture
+def async_client(client):
+    """
+    Cliente que usa AsyncSession (aiosqlite) sobre la misma BD de test.
+    """
+    engine = create_async_engine(database.to_async_url("sqlite:///./test.db"), poolclass=NullPool)
+    factory = async_sessionmaker(engine, autoflush=False)
+
+    async def override_get_runner():
+        async with factory() as session:
+            yield database.AsyncRunner(session)
+
+    app.dependency_overrides[database.get_runner] = override_get_runner
+    yield client
+    app.dependency_overrides.pop(database.get_runner, None)
+
+@pytest.mark.unit
+def test_to_async_url():
+    """
+    Test: Traducción de URLs síncronas a drivers asíncronos.
+    """
+    assert database.to_async_url("postgresql://u:p@localhost/db") == "postgresql+asyncpg://u:p@localhost/db"
+    assert database.to_async_url("postgresql+psycopg2://localhost/db") == "postgresql+asyncpg://localhost/db"
+    assert database.to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+@pytest.mark.integration
+def test_async_mode_crud_flow(async_client):
+    """
+    Test: Registro, login y CRUD completo en modo asíncrono.
+    """
+    response = async_client.post(
+        "/users/register",
+        json={"email": "async@example.com", "password": "password123"}
+    )
+    assert response.status_code == 200
+
+    token = async_client.post(
+        "/users/login",
+        data={"username": "async@example.com", "password": "password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    created = async_client.post(
+        "/items/", headers=headers,
+        json={"nombre": "Async", "precio": 10, "en_stock": True}
+    ).json()
+    assert created["nombre"] == "Async"
+
+    updated = async_client.put(
+        f"/items/{created['id']}", headers=headers,
+        json={"nombre": "Async 2", "precio": 20, "en_stock": False}
+    )
+    assert updated.json()["precio"] == 20
+
+    listed = async_client.get("/items/", headers=headers).json()
+    assert [item["nombre"] for item in listed] == ["Async 2"]
+
+    exported = async_client.get("/items/export", headers=headers)
+    assert exported.status_code == 200
+    assert "Async 2" in exported.text
+
+    assert async_client.delete(f"/items/{created['id']}", headers=headers).status_code == 200
+    assert async_client.get(f"/items/{created['id']}", headers=headers).status_code == 404
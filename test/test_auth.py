@@ -66,4 +66,79 @@ def test_password_length_validation():
     hashed = hash_password(long_password)
     
     # Debe funcionar sin error
-    assert verify_password(long_password, hashed) is True
\ No newline at end of file
+    assert verify_password(long_password, hashed) is True
+
+@pytest.mark.unit
+def test_decode_token_uses_cache(monkeypatch):
+    """
+    Test: Un token repetido no vuelve a verificarse.
+    """
+    from app import auth
+    token = create_access_token({"sub": "1"})
+
+    claims = auth.decode_token(token)
+    assert claims["sub"] == "1"
+    # Modificar los claims retornados no altera la entrada cacheada
+    claims["sub"] = "2"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("jwt.decode no debería llamarse")
+    monkeypatch.setattr(auth.jwt, "decode", fail)
+
+    assert auth.decode_token(token)["sub"] == "1"
+    assert auth.token_cache.hits == 1
+
+@pytest.mark.unit
+def test_decode_token_invalid_not_cached():
+    """
+    Test: Un token inválido lanza JWTError y no se cachea.
+    """
+    from app import auth
+    from jose import JWTError
+
+    for _ in range(2):
+        with pytest.raises(JWTError):
+            auth.decode_token("no.es.un.jwt")
+    assert auth.token_cache.hits == 0
+
+@pytest.mark.unit
+def test_decode_token_cache_expires_with_token():
+    """
+    Test: La entrada en caché no vive más que el exp del token.
+    """
+    from app import auth
+    from jose import JWTError
+    expired = jwt.encode({"sub": "1", "exp": 0}, os.getenv("SECRET_KEY"), algorithm=os.getenv("ALGORITHM"))
+
+    with pytest.raises(JWTError):
+        auth.decode_token(expired)
+    assert len(auth.token_cache.backend) == 0
+
+@pytest.mark.unit
+def test_hashing_pool_rejects_when_saturated():
+    """
+    Test: Con todas las plazas ocupadas el pool rechaza en vez de encolar.
+    """
+    import asyncio
+    import threading
+    from app.auth import PasswordHashingPool, HashingPoolSaturated
+
+    pool = PasswordHashingPool(workers=1, max_pending=0)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HashingPoolSaturated):
+            await pool.run(hash_password, "mypassword123")
+        release.set()
+        await blocked
+        return await pool.run(hash_password, "mypassword123")
+
+    hashed = asyncio.run(scenario())
+
+    assert verify_password("mypassword123", hashed)
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
@@ -0,0 +1,49 @@
+# test/test_benchmarks.py
+import json
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks import load, owner_indexes
+
+@pytest.mark.unit
+def test_percentile_nearest_rank():
+    values = sorted(float(v) for v in range(1, 101))
+    assert load.percentile(values, 50) == 50
+    assert load.percentile(values, 99) == 99
+    assert load.percentile([7.0], 95) == 7
+    assert load.percentile([], 95) == 0
+
+@pytest.mark.unit
+def test_compare_reports_p95_regressions():
+    baseline = {"operations": {"list": {"p95_ms": 10.0, "rps": 100.0}}}
+    current = {"operations": {"list": {"p95_ms": 12.0, "rps": 90.0}, "get": {"p95_ms": 1.0, "rps": 1.0}}}
+    assert load.compare(current, baseline, 0.10) == ["list: p95 10.00 -> 12.00 ms (+20.0%)"]
+    assert load.compare(current, baseline, 0.25) == []
+
+@pytest.mark.integration
+def test_load_run_in_process(tmp_path):
+    """
+    Test: Una ejecución corta en proceso siembra su propia BD y guarda el JSON.
+    """
+    output = tmp_path / "resultados.json"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'bench.db'}")
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.load", "--users", "2", "--items", "10", "--mix", "lectura",
+         "--requests", "30", "--concurrency", "3", "--json", str(output)],
+        check=True, env=env, capture_output=True, timeout=120
+    )
+
+    results = json.loads(output.read_text())
+    assert results["summary"]["requests"] == 30
+    assert results["summary"]["errors"] == 0
+    assert set(results["summary"]["operations"]) == {"list", "search", "get"}
+
+@pytest.mark.integration
+def test_owner_indexes_run_small(tmp_path):
+    """
+    Test: El benchmark de índices siembra en la revisión 0002 y mide antes y después de head.
+    """
+    results = owner_indexes.run(f"sqlite:///{tmp_path / 'bench.db'}", users=2, items_per_user=5, repeat=1)
+    assert set(results["antes"]) == set(results["despues"]) == set(owner_indexes.QUERIES)
+    assert "ix_items_owner" in results["despues"]["listar"]["plan"]
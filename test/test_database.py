@@ -0,0 +1,52 @@
+# test/test_database.py
+import pytest
+from sqlalchemy import create_engine, exc, text
+from app import database
+
+@pytest.mark.unit
+def test_pool_metrics_track_checkouts_and_timeouts(tmp_path, monkeypatch):
+    """
+    Test: El pool instrumentado cuenta checkouts, conexiones en uso y timeouts.
+    """
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(database, "DB_POOL_TIMEOUT", 0.05)
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **database.engine_options(url))
+
+    conn = engine.connect()
+    conn.execute(text("SELECT 1"))
+    stats = database.pool_stats(engine)
+    assert stats["class"] == "InstrumentedQueuePool"
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    conn.close()
+
+    stats = database.pool_stats(engine)
+    assert stats["timeouts"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["waiting"] == 0
+    engine.dispose()
+
+@pytest.mark.unit
+def test_pgbouncer_mode_uses_null_pool(monkeypatch):
+    """
+    Test: DB_PGBOUNCER desactiva el pool y los prepared statements de asyncpg.
+    """
+    monkeypatch.setattr(database, "DB_PGBOUNCER", True)
+    options = database.engine_options("postgresql://localhost/db", is_async=True)
+
+    assert options["poolclass"] is database.NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+
+@pytest.mark.integration
+def test_stats_exposes_pool(client, app_database):
+    """
+    Test: /stats incluye el estado del pool (el del engine de la app sobre la BD de test).
+    """
+    pool = client.get("/stats").json()["pool"]
+    assert {"size", "checked_out", "waiting", "avg_checkout_ms"} <= pool.keys()
+    assert pool["checkouts"] == app_database.pool.checkouts
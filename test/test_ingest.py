@@ -0,0 +1,122 @@
+# test/test_ingest.py
+import asyncio
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app import crud, database, etags, ingest, models, schemas
+
+@pytest.fixture
+def make_writer(test_engine):
+    """
+    BatchWriter cuyos lotes se escriben en la BD de test.
+    """
+    sessions = sessionmaker(bind=test_engine, autoflush=False)
+
+    def make(**options):
+        return ingest.BatchWriter(open_runner=lambda shard: database.SyncRunner(sessions()), **options)
+    return make
+
+@pytest.mark.integration
+def test_batched_create_returns_after_commit(client, db_session, auth_headers, test_user, make_writer, monkeypatch):
+    """
+    Test: Con INGEST_BATCHING, POST /items/ responde con el item ya guardado y su ETag.
+    """
+    monkeypatch.setattr(ingest, "INGEST_BATCHING", True)
+    monkeypatch.setattr(ingest, "writer", make_writer(max_rows=100, max_wait_ms=5, queue_size=100))
+    batches = ingest.writer.batches
+
+    response = client.post("/items/", json={"nombre": "Agrupado", "precio": 5.0}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["owner_id"] == test_user.id
+    assert response.headers["ETag"] == etags.item_etag(body["version"])
+    assert db_session.get(models.Item, body["id"]).nombre == "Agrupado"
+    assert ingest.writer.batches == batches + 1
+
+    # El listado (y su ETag) ve el item nuevo
+    assert [item["id"] for item in client.get("/items/", headers=auth_headers).json()] == [body["id"]]
+
+@pytest.mark.integration
+def test_concurrent_submits_share_one_commit(db_session, test_user, make_writer):
+    """
+    Test: Las peticiones que llegan dentro de la ventana se escriben en un solo lote.
+    """
+    writer = make_writer(max_rows=100, max_wait_ms=50, queue_size=100)
+
+    async def scenario():
+        items = await asyncio.gather(*(
+            writer.submit(None, test_user.id, schemas.ItemCreate(nombre=f"Item {n}", precio=n))
+            for n in range(30)
+        ))
+        await writer.stop()
+        return items
+
+    items = asyncio.run(scenario())
+    assert [item.nombre for item in items] == [f"Item {n}" for n in range(30)]
+    assert len({item.id for item in items}) == 30
+    assert writer.batches == 1
+    assert writer.max_batch == 30
+    assert db_session.query(models.Item).filter_by(owner_id=test_user.id).count() == 30
+    assert crud.get_owner_version(db_session, test_user.id) == 1
+
+@pytest.mark.integration
+def test_failed_batch_is_retried_row_by_row(db_session, test_user, make_writer, monkeypatch):
+    """
+    Test: Si el lote falla, cada fila se reintenta sola y solo fallan las que fallan.
+    """
+    original = crud.create_items_batch
+
+    def flaky(db, entries):
+        if len(entries) > 1 or entries[0][1].nombre == "mala":
+            raise ValueError("lote rechazado")
+        return original(db, entries)
+    monkeypatch.setattr(crud, "create_items_batch", flaky)
+    writer = make_writer(max_rows=100, max_wait_ms=50, queue_size=100)
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            writer.submit(None, test_user.id, schemas.ItemCreate(nombre=nombre, precio=1))
+            for nombre in ("buena", "mala", "otra")
+        ), return_exceptions=True)
+        await writer.stop()
+        return results
+
+    buena, mala, otra = asyncio.run(scenario())
+    assert buena.nombre == "buena" and otra.nombre == "otra"
+    assert isinstance(mala, ValueError)
+    assert writer.fallback_rows == 3
+
+@pytest.mark.unit
+def test_full_queue_rejects_immediately():
+    """
+    Test: Con la cola llena, submit lanza IngestQueueFull sin esperar.
+    """
+    writer = ingest.BatchWriter(max_rows=10, max_wait_ms=1000, queue_size=1)
+
+    async def scenario():
+        # El flusher no llega a ejecutarse antes de la segunda y tercera petición
+        tasks = [
+            asyncio.ensure_future(writer.submit(None, 1, schemas.ItemCreate(nombre="x", precio=1)))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        rejected = [task for task in tasks[1:] if isinstance(task.exception(), ingest.IngestQueueFull)]
+        # Sin stop(): asyncio.run cancela el flusher antes de que escriba nada
+        tasks[0].cancel()
+        return len(rejected)
+
+    assert asyncio.run(scenario()) == 2
+    assert writer.rejected == 2
+
+@pytest.mark.integration
+def test_full_queue_returns_503(client, auth_headers, monkeypatch):
+    """
+    Test: POST /items/ con la cola llena responde 503 con Retry-After.
+    """
+    async def full(*args):
+        raise ingest.IngestQueueFull()
+    monkeypatch.setattr(ingest, "INGEST_BATCHING", True)
+    monkeypatch.setattr(ingest.writer, "submit", full)
+
+    response = client.post("/items/", json={"nombre": "x", "precio": 1}, headers=auth_headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
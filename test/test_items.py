@@ -1,4 +1,5 @@
 # test/test_items.py
+import json
 import pytest
 from app import models  # ← MOVER AQUÍ AL INICIO
 
@@ -178,4 +179,509 @@ def test_search_items_by_min_price(client, auth_headers, db_session, test_user):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 2
-    assert all(item["precio"] >= 500 for item in data)
\ No newline at end of file
+    assert all(item["precio"] >= 500 for item in data)
+
+@pytest.mark.integration
+def test_get_items_cursor_pagination(client, auth_headers, db_session, test_user):
+    """
+    Test: Recorrer los items página a página con el cursor.
+    """
+    for i in range(5):
+        db_session.add(models.Item(nombre=f"Item {i}", precio=10 * i, owner_id=test_user.id, en_stock=True))
+    db_session.commit()
+
+    response = client.get("/items/?limit=2", headers=auth_headers)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page) == 2
+    cursor = response.headers["X-Next-Cursor"]
+
+    seen = [item["id"] for item in first_page]
+    while cursor:
+        response = client.get(f"/items/?limit=2&cursor={cursor}", headers=auth_headers)
+        assert response.status_code == 200
+        seen += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+@pytest.mark.integration
+def test_search_items_cursor_sorted_by_price(client, auth_headers, db_session, test_user):
+    """
+    Test: Paginación por (precio, id) en la búsqueda.
+    """
+    for precio in [300, 100, 200, 100]:
+        db_session.add(models.Item(nombre="Cable", precio=precio, owner_id=test_user.id, en_stock=True))
+    db_session.commit()
+
+    response = client.get("/items/buscar/?nombre=cable&sort=precio&limit=3", headers=auth_headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["precio"] for item in page] == [100, 100, 200]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/items/buscar/?nombre=cable&sort=precio&limit=3&cursor={cursor}", headers=auth_headers)
+    assert [item["precio"] for item in response.json()] == [300]
+    assert "X-Next-Cursor" not in response.headers
+
+@pytest.mark.integration
+def test_get_items_invalid_cursor(client, auth_headers):
+    """
+    Test: Un cursor corrupto o de otro orden devuelve 400.
+    """
+    response = client.get("/items/?cursor=no-es-un-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+    from app.pagination import encode_cursor
+    response = client.get(f"/items/?cursor={encode_cursor('precio', [1.0, 1])}", headers=auth_headers)
+    assert response.status_code == 400
+
+@pytest.mark.integration
+def test_export_items_ndjson(client, auth_headers, db_session, test_user, test_user2):
+    """
+    Test: Exportar items en NDJSON, solo los del usuario logueado.
+    """
+    for i in range(3):
+        db_session.add(models.Item(nombre=f"Item {i}", precio=i, owner_id=test_user.id, en_stock=True))
+    db_session.add(models.Item(nombre="Ajeno", precio=1, owner_id=test_user2.id, en_stock=True))
+    db_session.commit()
+
+    response = client.get("/items/export", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["nombre"] for row in rows] == ["Item 0", "Item 1", "Item 2"]
+    assert all(row["owner_id"] == test_user.id for row in rows)
+
+@pytest.mark.integration
+def test_export_items_csv(client, auth_headers, test_item):
+    """
+    Test: Exportar items en CSV con cabecera.
+    """
+    response = client.get("/items/export?formato=csv", headers=auth_headers)
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,nombre,descripcion,precio,en_stock,owner_id"
+    assert "Test Laptop" in lines[1]
+    assert len(lines) == 2
+
+@pytest.mark.integration
+def test_bulk_create_items(client, auth_headers, test_user):
+    """
+    Test: Crear varios items en una sola petición.
+    """
+    payload = [
+        {"nombre": f"Bulk {i}", "precio": i, "en_stock": True}
+        for i in range(3)
+    ]
+    response = client.post("/items/bulk", headers=auth_headers, json=payload)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["exitosos"] == 3
+    assert data["fallidos"] == 0
+    assert [r["indice"] for r in data["resultados"]] == [0, 1, 2]
+
+    created = client.get(f"/items/{data['resultados'][1]['id']}", headers=auth_headers).json()
+    assert created["nombre"] == "Bulk 1"
+    assert created["owner_id"] == test_user.id
+
+@pytest.mark.integration
+def test_bulk_update_items(client, auth_headers, db_session, test_item, test_user2):
+    """
+    Test: Actualizar en lote reporta los ids ajenos o inexistentes por fila.
+    """
+    other = models.Item(nombre="Ajeno", precio=1, owner_id=test_user2.id, en_stock=True)
+    db_session.add(other)
+    db_session.commit()
+    item_id, other_id = test_item.id, other.id
+
+    payload = [
+        {"id": item_id, "nombre": "Renombrado", "precio": 5, "en_stock": False},
+        {"id": other_id, "nombre": "Hackeado", "precio": 0, "en_stock": False},
+        {"id": 99999, "nombre": "Nada", "precio": 0, "en_stock": False},
+    ]
+    response = client.patch("/items/bulk", headers=auth_headers, json=payload)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["exitosos"] == 1
+    assert [r["ok"] for r in data["resultados"]] == [True, False, False]
+
+    updated = client.get(f"/items/{item_id}", headers=auth_headers).json()
+    assert updated["nombre"] == "Renombrado"
+    assert updated["en_stock"] is False
+    assert db_session.get(models.Item, other_id).nombre == "Ajeno"
+
+@pytest.mark.integration
+def test_bulk_delete_items(client, auth_headers, test_item):
+    """
+    Test: Eliminar en lote, con ids repetidos e inexistentes.
+    """
+    item_id = test_item.id
+    response = client.request(
+        "DELETE", "/items/bulk", headers=auth_headers,
+        json=[item_id, item_id, 99999]
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["ok"] for r in data["resultados"]] == [True, False, False]
+    assert data["resultados"][1]["error"] == "Id duplicado"
+    assert client.get(f"/items/{item_id}", headers=auth_headers).status_code == 404
+
+@pytest.mark.integration
+def test_search_items_full_text_ranked(client, auth_headers, db_session, test_user):
+    """
+    Test: `q` busca en nombre y descripción y ordena por relevancia.
+    """
+    items = [
+        models.Item(nombre="Teclado", descripcion="Teclado mecánico", precio=80, owner_id=test_user.id, en_stock=True),
+        models.Item(nombre="Hub USB", descripcion="Hub USB-C con puertos USB", precio=30, owner_id=test_user.id, en_stock=True),
+        models.Item(nombre="Cable", descripcion="Cable usb trenzado", precio=10, owner_id=test_user.id, en_stock=True),
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+
+    response = client.get("/items/buscar/?q=usb", headers=auth_headers)
+
+    assert response.status_code == 200
+    nombres = [item["nombre"] for item in response.json()]
+    assert nombres == ["Hub USB", "Cable"]
+
+@pytest.mark.integration
+def test_search_index_follows_updates_and_deletes(client, auth_headers, test_item):
+    """
+    Test: El índice de texto se mantiene al actualizar y borrar items.
+    """
+    item_id = test_item.id
+    client.put(
+        f"/items/{item_id}", headers=auth_headers,
+        json={"nombre": "Monitor", "descripcion": "Pantalla", "precio": 100, "en_stock": True}
+    )
+    assert client.get("/items/buscar/?q=laptop", headers=auth_headers).json() == []
+    assert len(client.get("/items/buscar/?q=pantalla", headers=auth_headers).json()) == 1
+
+    client.delete(f"/items/{item_id}", headers=auth_headers)
+    assert client.get("/items/buscar/?q=pantalla", headers=auth_headers).json() == []
+
+@pytest.mark.integration
+def test_search_items_short_text_falls_back_to_like(client, auth_headers, db_session, test_user):
+    """
+    Test: Textos de menos de 3 caracteres también encuentran resultados.
+    """
+    db_session.add(models.Item(nombre="Laptop HP", precio=800, owner_id=test_user.id, en_stock=True))
+    db_session.commit()
+
+    assert len(client.get("/items/buscar/?q=hp", headers=auth_headers).json()) == 1
+    assert len(client.get("/items/buscar/?nombre=hp", headers=auth_headers).json()) == 1
+
+@pytest.mark.integration
+def test_update_item_is_single_statement(client, auth_headers, test_item, capture_sql):
+    """
+    Test: PUT hace una sola sentencia sobre items (UPDATE ... RETURNING) y sube la versión.
+    """
+    item_id = test_item.id
+    client.get("/items/", headers=auth_headers)  # carga el usuario en caché
+
+    with capture_sql() as statements:
+        response = client.put(
+            f"/items/{item_id}", headers=auth_headers,
+            json={"nombre": "Nuevo", "precio": 1, "en_stock": True}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] == '"v2"'
+    item_statements = [s for s in statements if "owner_versions" not in s]
+    assert len(item_statements) == 1
+    assert item_statements[0].startswith("UPDATE items")
+
+@pytest.mark.integration
+def test_update_item_if_match(client, auth_headers, test_item):
+    """
+    Test: Con If-Match obsoleto la escritura se rechaza con 412.
+    """
+    item_id = test_item.id
+    etag = client.get(f"/items/{item_id}", headers=auth_headers).headers["ETag"]
+    payload = {"nombre": "Primero", "precio": 1, "en_stock": True}
+
+    first = client.put(f"/items/{item_id}", headers={**auth_headers, "If-Match": etag}, json=payload)
+    assert first.status_code == 200
+
+    second = client.put(f"/items/{item_id}", headers={**auth_headers, "If-Match": etag}, json=payload)
+    assert second.status_code == 412
+
+    stale_delete = client.delete(f"/items/{item_id}", headers={**auth_headers, "If-Match": etag})
+    assert stale_delete.status_code == 412
+
+    fresh_delete = client.delete(f"/items/{item_id}", headers={**auth_headers, "If-Match": first.headers["ETag"]})
+    assert fresh_delete.status_code == 200
+
+@pytest.mark.integration
+def test_update_missing_item_with_if_match_is_404(client, auth_headers):
+    """
+    Test: Un item inexistente sigue siendo 404 aunque haya If-Match.
+    """
+    response = client.put(
+        "/items/99999", headers={**auth_headers, "If-Match": '"v1"'},
+        json={"nombre": "X", "precio": 1, "en_stock": True}
+    )
+    assert response.status_code == 404
+
+@pytest.mark.integration
+def test_patch_item_only_sent_fields(client, auth_headers, test_item, capture_sql):
+    """
+    Test: PATCH escribe solo las columnas enviadas.
+    """
+    item_id = test_item.id
+    client.get("/items/", headers=auth_headers)  # carga el usuario en caché
+
+    with capture_sql() as statements:
+        response = client.patch(f"/items/{item_id}", headers=auth_headers, json={"en_stock": False})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["en_stock"] is False
+    assert data["nombre"] == "Test Laptop"
+    assert data["version"] == 2
+    item_statements = [s for s in statements if "owner_versions" not in s]
+    assert len(item_statements) == 1
+    set_clause = item_statements[0].split("WHERE")[0]
+    assert "en_stock" in set_clause and "nombre" not in set_clause
+
+@pytest.mark.integration
+def test_patch_item_without_changes_skips_write(client, auth_headers, test_item):
+    """
+    Test: Si los valores no cambian no se escribe ni sube la versión.
+    """
+    item_id = test_item.id
+
+    response = client.patch(f"/items/{item_id}", headers=auth_headers, json={"en_stock": True, "precio": 999.99})
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+
+    response = client.patch(f"/items/{item_id}", headers=auth_headers, json={})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"v1"'
+
+@pytest.mark.integration
+def test_patch_item_validation_and_not_found(client, auth_headers, test_item):
+    """
+    Test: nombre/precio/en_stock no aceptan null; un item ajeno o inexistente es 404.
+    """
+    response = client.patch(f"/items/{test_item.id}", headers=auth_headers, json={"nombre": None})
+    assert response.status_code == 422
+
+    response = client.patch("/items/99999", headers=auth_headers, json={"en_stock": False})
+    assert response.status_code == 404
+
+    response = client.patch(f"/items/{test_item.id}", headers={**auth_headers, "If-Match": '"v7"'}, json={"en_stock": False})
+    assert response.status_code == 412
+
+@pytest.mark.integration
+def test_list_items_not_modified(client, auth_headers, test_item, capture_sql):
+    """
+    Test: Repetir el listado con If-None-Match da 304 sin consultar items.
+    """
+    first = client.get("/items/", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    with capture_sql() as statements:
+        second = client.get("/items/", headers={**auth_headers, "If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert not any("FROM items" in s for s in statements)
+
+@pytest.mark.integration
+def test_list_items_etag_changes_after_write(client, auth_headers, test_item):
+    """
+    Test: Cualquier escritura del usuario invalida la ETag y el cuerpo en caché.
+    """
+    first = client.get("/items/", headers=auth_headers)
+    etag = first.headers["ETag"]
+
+    client.patch(f"/items/{test_item.id}", headers=auth_headers, json={"nombre": "Cambiado"})
+
+    second = client.get("/items/", headers={**auth_headers, "If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+    assert second.json()[0]["nombre"] == "Cambiado"
+
+    # Otra consulta (otros parámetros) tiene su propia ETag
+    other = client.get("/items/?sort=precio", headers=auth_headers)
+    assert other.headers["ETag"] != second.headers["ETag"]
+
+@pytest.mark.integration
+def test_list_items_served_from_cache(client, auth_headers, test_item, capture_sql):
+    """
+    Test: Sin If-None-Match el cuerpo se sirve de la caché hasta la siguiente escritura.
+    """
+    first = client.get("/items/buscar/?nombre=lap", headers=auth_headers)
+
+    with capture_sql() as statements:
+        second = client.get("/items/buscar/?nombre=lap", headers=auth_headers)
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert not any("FROM items" in s for s in statements)
+
+@pytest.mark.integration
+def test_response_cache_entries_are_json_and_bounded(client, auth_headers, test_item, monkeypatch):
+    """
+    Test: La caché de listados guarda valores JSON (aptos para un backend compartido)
+    y no guarda cuerpos por encima de RESPONSE_CACHE_MAX_BODY_BYTES.
+    """
+    from app import cache, http_cache
+    backend = cache.MemoryBackend(100, max_bytes=10000, weigh=lambda entry: len(entry["body"]))
+    monkeypatch.setattr(http_cache.response_cache, "backend", backend)
+
+    client.get("/items/", headers=auth_headers)
+    entry, = [value for value, _, _ in backend._data.values()]
+    assert json.loads(json.dumps(entry))["body"] == client.get("/items/", headers=auth_headers).text
+    assert backend.bytes == len(entry["body"])
+
+    monkeypatch.setattr(http_cache, "RESPONSE_CACHE_MAX_BODY_BYTES", 10)
+    client.get("/items/?sort=precio", headers=auth_headers)
+    assert len(backend) == 1
+
+    # El presupuesto total expulsa las entradas más antiguas
+    backend.max_bytes = len(entry["body"])
+    backend.set("otra", {"body": "x" * len(entry["body"])}, 60)
+    assert len(backend) == 1 and backend.bytes == len(entry["body"])
+
+@pytest.mark.integration
+def test_get_item_not_modified(client, auth_headers, test_item):
+    """
+    Test: GET /items/{id} responde 304 mientras la versión del item no cambie.
+    """
+    item_id = test_item.id
+    etag = client.get(f"/items/{item_id}", headers=auth_headers).headers["ETag"]
+
+    response = client.get(f"/items/{item_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    client.patch(f"/items/{item_id}", headers=auth_headers, json={"precio": 1})
+    response = client.get(f"/items/{item_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"v2"'
+
+@pytest.mark.integration
+def test_fast_json_lists_match_pydantic(client, auth_headers, db_session, test_user, monkeypatch):
+    """
+    Test: Con FAST_JSON los listados (tuplas + orjson) son idénticos a los de Pydantic.
+    """
+    from app import http_cache
+
+    db_session.add_all([
+        models.Item(nombre=f"Cable {i}", descripcion=None if i % 2 else "usb", precio=i * 1.5, en_stock=bool(i % 3), owner_id=test_user.id)
+        for i in range(5)
+    ])
+    db_session.commit()
+    urls = ["/items/?limit=2", "/items/?sort=precio", "/items/buscar/?q=cable", "/items/buscar/?nombre=cab&min_precio=2"]
+
+    expected = {}
+    for url in urls:
+        response = client.get(url, headers=auth_headers)
+        expected[url] = (response.json(), response.headers.get("X-Next-Cursor"))
+
+    monkeypatch.setattr(http_cache, "FAST_JSON", True)
+    http_cache.response_cache.clear()
+    for url in urls:
+        response = client.get(url, headers=auth_headers)
+        assert (response.json(), response.headers.get("X-Next-Cursor")) == expected[url]
+
+    cursor = expected["/items/?limit=2"][1]
+    page = client.get(f"/items/?limit=2&cursor={cursor}", headers=auth_headers)
+    assert page.status_code == 200 and len(page.json()) == 2
+
+@pytest.mark.integration
+def test_item_stats(client, auth_headers, db_session, test_user):
+    """
+    Test: /items/stats agrega en SQL, con histograma y los filtros de /buscar/.
+    """
+    db_session.add_all([
+        models.Item(nombre=f"Cable {i}", precio=float(i), en_stock=i < 3, owner_id=test_user.id)
+        for i in range(11)
+    ])
+    db_session.commit()
+
+    data = client.get("/items/stats?buckets=5", headers=auth_headers).json()
+    assert data["total"] == 11
+    assert data["en_stock"] == 3
+    assert data["precio_total"] == 55
+    assert data["precio_promedio"] == 5
+    assert (data["precio_min"], data["precio_max"]) == (0, 10)
+    assert [b["cantidad"] for b in data["histograma"]] == [2, 2, 2, 2, 3]
+    assert data["histograma"][-1]["hasta"] == 10
+
+    filtered = client.get("/items/stats?nombre=cab&min_precio=8", headers=auth_headers).json()
+    assert filtered["total"] == 3
+    assert filtered["en_stock"] == 0
+
+@pytest.mark.integration
+def test_item_stats_empty(client, auth_headers):
+    """
+    Test: Sin items las estadísticas están vacías (no 404).
+    """
+    response = client.get("/items/stats", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {
+        "total": 0, "en_stock": 0, "precio_total": 0, "precio_promedio": None,
+        "precio_min": None, "precio_max": None, "histograma": []
+    }
+
+@pytest.mark.integration
+def test_search_items_price_range_stock_and_sort(client, auth_headers, db_session, test_user):
+    """
+    Test: max_precio, en_stock y sort descendente con paginación por cursor.
+    """
+    db_session.add_all([
+        models.Item(nombre=nombre, precio=precio, en_stock=stock, owner_id=test_user.id)
+        for nombre, precio, stock in [("b", 10, True), ("a", 30, True), ("d", 20, False), ("c", 40, True)]
+    ])
+    db_session.commit()
+
+    response = client.get("/items/buscar/?min_precio=15&max_precio=40&en_stock=true&sort=-precio", headers=auth_headers)
+    assert [i["precio"] for i in response.json()] == [40, 30]
+
+    first = client.get("/items/buscar/?max_precio=40&sort=-nombre&limit=2", headers=auth_headers)
+    assert [i["nombre"] for i in first.json()] == ["d", "c"]
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"/items/buscar/?max_precio=40&sort=-nombre&limit=2&cursor={cursor}", headers=auth_headers)
+    assert [i["nombre"] for i in second.json()] == ["b", "a"]
+
+@pytest.mark.integration
+def test_search_items_fields_projection(client, auth_headers, db_session, test_user, capture_sql):
+    """
+    Test: fields= devuelve y lee solo las columnas pedidas (más las del orden).
+    """
+    db_session.add_all([
+        models.Item(nombre=f"Cable {i}", descripcion="largo", precio=i, owner_id=test_user.id)
+        for i in range(3)
+    ])
+    db_session.commit()
+
+    with capture_sql() as statements:
+        response = client.get("/items/buscar/?fields=nombre&sort=precio&limit=2", headers=auth_headers)
+    assert response.json() == [{"nombre": "Cable 0"}, {"nombre": "Cable 1"}]
+    assert "X-Next-Cursor" in response.headers
+    select_clause = next(s for s in statements if "FROM items" in s).split("FROM")[0]
+    assert "descripcion" not in select_clause
+
+    cursor = response.headers["X-Next-Cursor"]
+    page = client.get(f"/items/buscar/?fields=nombre&sort=precio&limit=2&cursor={cursor}", headers=auth_headers)
+    assert [i["nombre"] for i in page.json()][0] == "Cable 2"
+
+    response = client.get("/items/buscar/?fields=nombre,secreto", headers=auth_headers)
+    assert response.status_code == 400
+
+    # El esquema documentado sigue siendo el de ItemResponse
+    schema = client.get("/openapi.json").json()["paths"]["/items/buscar/"]["get"]
+    assert schema["responses"]["200"]["content"]["application/json"]["schema"]["items"]["$ref"].endswith("/ItemResponse")
@@ -0,0 +1,52 @@
+# test/test_lifecycle.py
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, inspect
+from app import database
+from app.main import app
+
+@pytest.mark.integration
+def test_startup_warms_pool_and_hashing(client, app_database):
+    """
+    Test: El lifespan abre las conexiones del pool y los hilos de bcrypt antes de servir.
+    """
+    report = app.state.warmup
+    assert report["connections"] == database.DB_POOL_SIZE
+    assert database.pool_stats(app_database)["checked_in"] >= database.DB_POOL_SIZE
+    assert database.pool_stats(app_database)["checked_out"] == 0
+
+    from app.auth import hashing_pool
+    assert hashing_pool._executor is not None
+
+@pytest.mark.integration
+def test_import_does_not_create_schema_and_init_db_does(tmp_path):
+    """
+    Test: Importar la app no ejecuta DDL; `python -m app init-db` aplica las migraciones.
+    """
+    url = f"sqlite:///{tmp_path / 'cli.db'}"
+    env = dict(os.environ, DATABASE_URL=url)
+
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True, env=env, timeout=60)
+    engine = create_engine(url)
+    assert inspect(engine).get_table_names() == []
+
+    subprocess.run([sys.executable, "-m", "app", "init-db"], check=True, env=env, timeout=120,
+                   capture_output=True)
+    tables = set(inspect(engine).get_table_names())
+    engine.dispose()
+    assert {"users", "items", "owner_versions", "alembic_version"} <= tables
+
+@pytest.mark.unit
+def test_shutdown_does_not_create_engines(monkeypatch):
+    """
+    Test: Cerrar sin haber usado la BD no crea el engine (ni carga su driver).
+    """
+    import asyncio
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_async_engine", None)
+
+    asyncio.run(database.dispose_engines())
+    assert database._engine is None and database._async_engine is None
+    assert database.pool_stats(database.current_engine()) == {"class": None}
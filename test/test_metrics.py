@@ -0,0 +1,75 @@
+# test/test_metrics.py
+import os
+import subprocess
+import sys
+import pytest
+from app import metrics
+
+def sample(name, **labels):
+    return metrics.REGISTRY.get_sample_value(name, {key: str(value) for key, value in labels.items()}) or 0
+
+@pytest.mark.unit
+def test_gauges_from_stats_skips_non_numeric():
+    """
+    Test: Solo los valores numéricos de /stats se exportan como gauges.
+    """
+    families = metrics.gauges_from_stats("app", {"pool": {"class": "QueuePool", "checked_out": 2, "enabled": True}})
+    assert [(family.name, family.samples[0].value) for family in families] == [("app_pool_checked_out", 2)]
+
+    family, = metrics.gauges_from_stats("app", {"pool": {"checked_out": 2}}, pid=123)
+    assert family.samples[0].labels == {"pid": "123"}
+
+@pytest.mark.integration
+def test_metrics_per_route_and_db_queries(client, app_database, auth_headers, test_item):
+    """
+    Test: Cada petición se cuenta con la plantilla de su ruta y sus consultas SQL.
+    """
+    route = "/items/{item_id}"
+    before = sample("http_requests_total", method="GET", route=route, status=200)
+    queries_before = sample("db_queries_per_request_sum", method="GET", route=route)
+
+    response = client.get(f"/items/{test_item.id}", headers=auth_headers)
+    assert response.status_code == 200
+
+    assert sample("http_requests_total", method="GET", route=route, status=200) == before + 1
+    assert sample("db_queries_per_request_sum", method="GET", route=route) > queries_before
+    assert sample("http_requests_in_flight", method="GET", route=route) == 0
+    assert metrics._routes[("GET", f"/items/{test_item.id}")] == route
+
+    client.get("/items/99999", headers=auth_headers)
+    assert sample("http_requests_total", method="GET", route=route, status=404) >= 1
+
+    body = client.get("/metrics").text
+    assert f'http_request_duration_seconds_count{{method="GET",route="{route}"}}' in body
+    assert "db_query_duration_seconds_bucket" in body
+    assert "app_user_cache_hits" in body
+    # Gauges del pool del engine de la app (sobre la BD de test)
+    assert "app_pool_checkouts" in body and "app_pool_checked_out" in body
+
+@pytest.mark.integration
+def test_metrics_password_hashing(client, test_user):
+    """
+    Test: El login registra el tiempo de bcrypt.
+    """
+    before = sample("password_hash_duration_seconds_count", operation="verify")
+    client.post("/users/login", data={"username": test_user.email, "password": "testpassword123"})
+    assert sample("password_hash_duration_seconds_count", operation="verify") == before + 1
+
+@pytest.mark.integration
+def test_metrics_aggregate_worker_processes(tmp_path):
+    """
+    Test: Con PROMETHEUS_MULTIPROC_DIR, /metrics suma los contadores de todos los procesos.
+    """
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = (
+        "from app import metrics\n"
+        "metrics.HTTP_REQUESTS.labels(method='GET', route='/items/', status=200).inc()\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], check=True, env=env, timeout=60)
+
+    scrape = subprocess.run(
+        [sys.executable, "-c", "from app import metrics; print(metrics.render().decode())"],
+        check=True, env=env, timeout=60, capture_output=True, text=True
+    ).stdout
+    assert 'http_requests_total{method="GET",route="/items/",status="200"} 2.0' in scrape
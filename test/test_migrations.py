@@ -0,0 +1,56 @@
+# test/test_migrations.py
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+from app.database import Base
+
+def _alembic_config(connection) -> Config:
+    config = Config("alembic.ini")
+    config.attributes["connection"] = connection
+    return config
+
+@pytest.fixture
+def migration_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+@pytest.mark.integration
+def test_upgrade_head_matches_models(migration_engine):
+    """
+    Test: Las migraciones producen el mismo esquema que los modelos.
+    """
+    with migration_engine.begin() as connection:
+        command.upgrade(_alembic_config(connection), "head")
+
+    with migration_engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection,
+            opts={"include_name": lambda name, type_, parents: not (type_ == "table" and name.startswith("items_fts"))}
+        )
+        assert compare_metadata(context, Base.metadata) == []
+
+        indexes = {index["name"] for index in inspect(connection).get_indexes("items")}
+        assert {"ix_items_owner_id_id", "ix_items_owner_id_precio", "ix_items_owner_id_nombre"} <= indexes
+
+@pytest.mark.integration
+def test_owner_index_used_and_downgrade(migration_engine):
+    """
+    Test: Listar los items de un usuario usa el índice compuesto; el downgrade lo elimina.
+    """
+    with migration_engine.begin() as connection:
+        command.upgrade(_alembic_config(connection), "head")
+
+    query = "EXPLAIN QUERY PLAN SELECT * FROM items WHERE owner_id = 1 ORDER BY id"
+    with migration_engine.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.execute(text(query)))
+    assert "ix_items_owner_id_id" in plan
+
+    with migration_engine.begin() as connection:
+        command.downgrade(_alembic_config(connection), "0002")
+    with migration_engine.connect() as connection:
+        indexes = {index["name"] for index in inspect(connection).get_indexes("items")}
+    assert "ix_items_owner_id_id" not in indexes
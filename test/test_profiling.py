@@ -0,0 +1,111 @@
+# test/test_profiling.py
+import json
+import logging
+import pytest
+from app import profiling
+
+@pytest.fixture
+def profiling_on(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_DEBUG_TOKEN", "secreto")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    profiling.clear()
+    yield tmp_path
+    profiling.clear()
+
+@pytest.mark.integration
+def test_profile_requested_by_header(client, auth_headers, test_item, profiling_on, monkeypatch):
+    """
+    Test: X-Profile: 1 guarda árbol de llamadas, SQL con tiempos y EXPLAIN de las lentas.
+    """
+    monkeypatch.setattr(profiling, "PROFILE_EXPLAIN_MS", 0)
+
+    debug = {"X-Debug-Token": "secreto"}
+    response = client.get("/items/", headers={**auth_headers, **debug, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers[profiling.PROFILE_ID_HEADER]
+
+    listed = client.get("/debug/profiles/", headers=debug).json()
+    assert listed[0]["id"] == profile_id
+    assert listed[0]["sql_count"] >= 1
+
+    detail = client.get(f"/debug/profiles/{profile_id}", headers=debug).json()
+    assert "cumulative" in detail["call_tree"]
+    select = next(s for s in detail["statements"] if "FROM items" in s["sql"])
+    assert "items" in select["explain"].lower()
+
+    saved = json.loads((profiling_on / f"{int(detail['started_at'])}-{profile_id}.json").read_text())
+    assert saved["id"] == profile_id
+    assert list(profiling_on.glob("*.prof"))
+
+    # Sin el token de depuración X-Profile se ignora y no se exponen los perfiles
+    for headers in ({}, {"X-Debug-Token": "otro"}):
+        response = client.get("/items/", headers={**auth_headers, **headers, "X-Profile": "1"})
+        assert profiling.PROFILE_ID_HEADER not in response.headers
+    assert client.get("/debug/profiles/").status_code == 403
+    assert client.get("/debug/profiles/", headers={"X-Debug-Token": "otro"}).status_code == 403
+
+@pytest.mark.unit
+def test_failed_explain_is_rolled_back_to_savepoint():
+    """
+    Test: Un EXPLAIN fallido dentro de una transacción se deshace con su SAVEPOINT
+    y no deja abortada la transacción de la petición.
+    """
+    executed = []
+
+    class Cursor:
+        def execute(self, sql, parameters=None):
+            executed.append(sql)
+            if sql.startswith("EXPLAIN"):
+                raise RuntimeError("sintaxis")
+
+        def close(self):
+            pass
+
+    class Conn:
+        class dialect:
+            name = "postgresql"
+
+        class connection:
+            class dbapi_connection:
+                cursor = Cursor
+
+        def in_transaction(self):
+            return True
+
+    assert profiling._explain(Conn(), "SELECT 1", {}).startswith("EXPLAIN falló")
+    assert executed == [
+        "SAVEPOINT profiling_explain", "EXPLAIN SELECT 1", "ROLLBACK TO SAVEPOINT profiling_explain"
+    ]
+
+@pytest.mark.integration
+def test_requests_not_profiled_by_default(client, auth_headers, test_item):
+    """
+    Test: Sin PROFILING_ENABLED la cabecera se ignora y /debug/profiles no existe.
+    """
+    response = client.get("/items/", headers={**auth_headers, "X-Profile": "1"})
+    assert profiling.PROFILE_ID_HEADER not in response.headers
+    assert client.get("/debug/profiles/").status_code == 404
+
+@pytest.mark.integration
+def test_slow_query_log(client, auth_headers, test_item, monkeypatch, caplog):
+    """
+    Test: Las sentencias por encima de SLOW_QUERY_LOG_MS se registran.
+    """
+    monkeypatch.setattr(profiling, "SLOW_QUERY_LOG_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+        client.get("/items/", headers=auth_headers)
+    assert any("FROM items" in record.getMessage() for record in caplog.records)
+
+@pytest.mark.integration
+def test_profile_files_are_pruned(client, auth_headers, profiling_on, monkeypatch):
+    """
+    Test: En PROFILE_DIR solo quedan los PROFILE_MAX_KEPT perfiles más recientes.
+    """
+    monkeypatch.setattr(profiling, "PROFILE_MAX_KEPT", 2)
+    headers = {**auth_headers, "X-Debug-Token": "secreto", "X-Profile": "1"}
+    ids = [client.get("/items/", headers=headers).headers[profiling.PROFILE_ID_HEADER] for _ in range(4)]
+
+    kept = sorted(path.name for path in profiling_on.iterdir())
+    assert len(kept) == 4
+    assert {name.split("-", 1)[1].rsplit(".", 1)[0] for name in kept} == set(ids[2:])
@@ -0,0 +1,62 @@
+# test/test_ratelimit.py
+import pytest
+from app import ratelimit
+
+@pytest.mark.unit
+def test_budget_parse():
+    budget = ratelimit.Budget.parse("600/m", "ip")
+    assert (budget.capacity, budget.period, budget.rate, budget.key) == (600, 60, 10, "ip")
+    assert ratelimit.Budget.parse("off") is None
+
+@pytest.mark.unit
+def test_memory_backend_token_bucket(monkeypatch):
+    """
+    Test: El bucket admite una ráfaga de `capacity` y se rellena a `rate` por segundo.
+    """
+    now = [100.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    backend = ratelimit.MemoryBackend(max_keys=10)
+
+    assert [backend.acquire("k", 2, 1) for _ in range(3)] == [0, 0, 1.0]
+    now[0] += 0.5
+    assert backend.acquire("k", 2, 1) == pytest.approx(0.5)
+    now[0] += 0.5
+    assert backend.acquire("k", 2, 1) == 0
+
+@pytest.mark.integration
+def test_search_rate_limited_per_user(client, auth_headers, monkeypatch):
+    """
+    Test: Agotado el presupuesto de búsqueda responde 429 con Retry-After; otras rutas siguen.
+    """
+    monkeypatch.setitem(ratelimit.limiter.budgets, "search", ratelimit.Budget(2, 60))
+
+    statuses = [client.get("/items/buscar/", headers=auth_headers).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+    response = client.get("/items/buscar/", headers=auth_headers)
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/items/", headers=auth_headers).status_code == 200
+
+@pytest.mark.integration
+def test_login_rate_limited_per_ip(client, test_user, monkeypatch):
+    monkeypatch.setitem(ratelimit.limiter.budgets, "login", ratelimit.Budget(1, 60, "ip"))
+    data = {"username": "testuser@example.com", "password": "incorrecta"}
+
+    assert client.post("/users/login", data=data).status_code == 400
+    assert client.post("/users/login", data=data).status_code == 429
+
+@pytest.mark.integration
+def test_admission_rejects_over_concurrency_cap(client, monkeypatch):
+    """
+    Test: Con el límite alcanzado se responde 503 sin entrar en la aplicación.
+    """
+    monkeypatch.setattr(ratelimit, "MAX_CONCURRENT_REQUESTS", 1)
+    middleware = client.app.middleware_stack
+    while not isinstance(middleware, ratelimit.AdmissionMiddleware):
+        middleware = middleware.app
+    monkeypatch.setattr(middleware, "in_flight", 1)
+
+    response = client.get("/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/stats").status_code == 200
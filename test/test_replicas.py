@@ -0,0 +1,135 @@
+# test/test_replicas.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models, replicas
+from app.database import Base
+
+def make_replica(tmp_path, name, users=(), items=()):
+    """
+    BD SQLite que hace de réplica: mismo esquema y las filas indicadas.
+    """
+    url = f"sqlite:///{tmp_path / name}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        for user in users:
+            db.add(models.User(id=user.id, email=user.email, hashed_password=user.hashed_password))
+        db.flush()
+        for item in items:
+            db.add(models.Item(**item))
+        db.commit()
+    engine.dispose()
+    return url
+
+@pytest.fixture
+def replica_set(monkeypatch):
+    """
+    Instala un ReplicaSet en lugar del global y lo libera al terminar.
+    """
+    installed = []
+
+    def install(urls, strategy="round_robin", lag=0.0):
+        lags = lag if callable(lag) else (lambda conn: lag)
+        replica_set = replicas.ReplicaSet(urls, strategy, lag_probe=lags)
+        monkeypatch.setattr(replicas, "replicas", replica_set)
+        installed.append(replica_set)
+        return replica_set
+    yield install
+    for replica_set in installed:
+        replica_set.dispose()
+
+@pytest.mark.unit
+def test_round_robin_and_least_connections(tmp_path, replica_set):
+    """
+    Test: round_robin alterna réplicas; least_connections elige la de menos sesiones abiertas.
+    """
+    urls = [f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"]
+
+    rr = replica_set(urls)
+    picked = []
+    for _ in range(4):
+        replica = rr.choose()
+        picked.append(replica.url)
+        replica.release()
+    assert picked == urls + urls
+
+    lc = replica_set(urls, strategy="least_connections")
+    first = lc.choose()
+    second = lc.choose()
+    assert first is not second
+    second.release()
+    assert lc.choose() is second
+    assert lc.stats()["reads"] == 3
+
+@pytest.mark.unit
+def test_lagging_or_failing_replicas_fall_back_to_primary(tmp_path, replica_set, monkeypatch):
+    """
+    Test: Con más retraso que DB_REPLICA_MAX_LAG_SECONDS o sin respuesta, se lee del primario
+    hasta la siguiente medición.
+    """
+    monkeypatch.setattr(replicas, "REPLICA_MAX_LAG_SECONDS", 5)
+    lag = {"value": 60.0}
+    lagging = replica_set([f"sqlite:///{tmp_path / 'a.db'}"], lag=lambda conn: lag["value"])
+    assert lagging.choose() is None
+    assert lagging.stats()["fallbacks"] == 1
+
+    # Hasta REPLICA_CHECK_SECONDS no se vuelve a medir
+    lag["value"] = 0.0
+    assert lagging.choose() is None
+    monkeypatch.setattr(replicas, "REPLICA_CHECK_SECONDS", 0)
+    assert lagging.choose() is not None
+
+    def broken(conn):
+        raise RuntimeError("sin conexión")
+    failing = replica_set([f"sqlite:///{tmp_path / 'b.db'}"], lag=broken)
+    assert failing.choose() is None
+    assert failing.stats()["nodes"][0]["healthy"] is False
+
+@pytest.mark.integration
+def test_reads_go_to_replica_and_writes_to_primary(client, db_session, auth_headers, test_user, tmp_path, replica_set):
+    """
+    Test: GET /items/ lee de la réplica; POST escribe en el primario.
+    """
+    url = make_replica(tmp_path, "replica.db", users=[test_user], items=[
+        {"nombre": "Solo en réplica", "precio": 1.0, "en_stock": True, "owner_id": test_user.id}
+    ])
+    replica_set([url])
+
+    response = client.get("/items/", headers=auth_headers)
+    assert response.status_code == 200
+    assert [item["nombre"] for item in response.json()] == ["Solo en réplica"]
+
+    response = client.post("/items/", json={"nombre": "Nuevo", "precio": 2.0}, headers=auth_headers)
+    assert response.status_code == 200
+    assert db_session.query(models.Item).filter_by(nombre="Nuevo").count() == 1
+    assert client.get("/items/", headers=auth_headers).json()[0]["nombre"] == "Solo en réplica"
+    assert replicas.replicas.stats()["reads"] >= 2
+
+@pytest.mark.integration
+def test_lagging_replica_reads_from_primary(client, auth_headers, test_item, tmp_path, replica_set):
+    """
+    Test: Una réplica retrasada no se usa; la lectura va al primario.
+    """
+    url = make_replica(tmp_path, "replica.db")
+    replica_set([url], lag=3600.0)
+
+    response = client.get("/items/", headers=auth_headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [test_item.id]
+    assert replicas.replicas.stats()["fallbacks"] >= 1
+
+@pytest.mark.integration
+def test_current_user_is_read_from_primary(client, db_session, auth_headers, test_user, tmp_path, replica_set):
+    """
+    Test: El usuario autenticado se carga del primario: una réplica sin el usuario, o con
+    una fila anterior a su desactivación, no se cachea.
+    """
+    from app.routes.users import user_cache
+    replica_set([make_replica(tmp_path, "replica.db", users=[test_user])])
+    db_session.get(models.User, test_user.id).is_active = False
+    db_session.commit()
+
+    response = client.get("/items/", headers=auth_headers)
+    assert response.status_code == 401
+    assert user_cache.get(test_user.id)["is_active"] is False
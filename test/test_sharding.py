@@ -0,0 +1,157 @@
+# test/test_sharding.py
+import asyncio
+import pytest
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.util import greenlet_spawn
+from app import models, sharding
+from app.database import Base
+
+@pytest.fixture
+def shard_urls(tmp_path):
+    """
+    Dos BDs SQLite con el esquema de shard.
+    """
+    urls = [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(2)]
+    for url in urls:
+        engine = create_engine(url)
+        sharding.init_shard_schema(engine)
+        engine.dispose()
+    return urls
+
+@pytest.fixture
+def sharded(shard_urls, test_engine, monkeypatch):
+    """
+    Activa el sharding por hash sobre los dos shards de test; el primario es la BD de test.
+    """
+    shard_set = sharding.ShardSet(
+        shard_urls, sharding.ShardMap(len(shard_urls)),
+        sharding.IdAllocator(block_size=3, engine=lambda: test_engine)
+    )
+    monkeypatch.setattr(sharding, "shards", shard_set)
+    yield shard_set
+    shard_set.dispose()
+
+def owner_items(url, owner_id):
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(models.Item.id).where(models.Item.owner_id == owner_id).order_by(models.Item.id)
+        ).scalars().all()
+    engine.dispose()
+    return rows
+
+@pytest.mark.unit
+def test_shard_map_hash_and_range():
+    """
+    Test: hash reparte por owner_id % shards; range usa los límites de SHARD_RANGES.
+    """
+    by_hash = sharding.ShardMap(3)
+    assert [by_hash.shard_for(owner) for owner in range(1, 7)] == [1, 2, 0, 1, 2, 0]
+
+    by_range = sharding.ShardMap(3, "range", [100, 200])
+    assert [by_range.shard_for(owner) for owner in (1, 99, 100, 199, 200, 10**6)] == [0, 0, 1, 1, 2, 2]
+
+    with pytest.raises(ValueError):
+        sharding.ShardMap(3, "range", [100])
+
+@pytest.mark.unit
+def test_init_shard_schema_without_foreign_keys(shard_urls):
+    """
+    Test: Los shards tienen items y owner_versions, sin FK a users ni tabla users.
+    """
+    engine = create_engine(shard_urls[0])
+    tables = set(inspect(engine).get_table_names())
+    assert {"items", "owner_versions", "items_fts"} <= tables
+    assert "users" not in tables
+    assert inspect(engine).get_foreign_keys("items") == []
+    assert sharding.init_shard_schema(engine) == []
+    engine.dispose()
+
+@pytest.mark.integration
+def test_items_are_stored_on_the_owner_shard(client, auth_headers, test_user, shard_urls, sharded):
+    """
+    Test: Los items se escriben y leen en el shard del usuario, con ids del contador global.
+    """
+    home = test_user.id % 2
+    created = [
+        client.post("/items/", json={"nombre": f"Item {n}", "precio": n}, headers=auth_headers).json()["id"]
+        for n in range(1, 3)
+    ]
+    response = client.post("/items/bulk", json=[{"nombre": f"Lote {n}", "precio": n} for n in range(3)],
+                           headers=auth_headers)
+    assert response.status_code == 200
+    created += [result["id"] for result in response.json()["resultados"]]
+
+    assert created == list(range(created[0], created[0] + 5))
+    assert owner_items(shard_urls[home], test_user.id) == created
+    assert owner_items(shard_urls[1 - home], test_user.id) == []
+
+    response = client.get("/items/", headers=auth_headers)
+    assert [item["id"] for item in response.json()] == created
+    assert client.get(f"/items/{created[0]}", headers=auth_headers).json()["nombre"] == "Item 1"
+    assert client.get("/items/buscar/?q=Lote", headers=auth_headers).status_code == 200
+
+@pytest.mark.integration
+def test_rebalance_moves_owner_items(client, auth_headers, test_user, test_engine, shard_urls, sharded, monkeypatch):
+    """
+    Test: rebalance copia los items al otro shard con los mismos ids (por bloques), actualiza
+    el directorio y la API los sigue sirviendo.
+    """
+    monkeypatch.setattr(sharding, "REBALANCE_CHUNK_SIZE", 2)
+    home = test_user.id % 2
+    ids = [
+        client.post("/items/", json={"nombre": f"Item {n}", "precio": n}, headers=auth_headers).json()["id"]
+        for n in range(3)
+    ]
+    etag = client.get("/items/", headers=auth_headers).headers["ETag"]
+
+    moved = sharding.rebalance(test_user.id, 1 - home, wait=0,
+                               primary_url=str(test_engine.url), shard_urls=shard_urls)
+    assert moved == 3
+    assert owner_items(shard_urls[1 - home], test_user.id) == ids
+    assert owner_items(shard_urls[home], test_user.id) == []
+
+    sharded.directory.clear()
+    response = client.get("/items/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == ids
+
+    # Moverlo a donde ya está no hace nada
+    assert sharding.rebalance(test_user.id, 1 - home, wait=0,
+                              primary_url=str(test_engine.url), shard_urls=shard_urls) == 0
+
+@pytest.mark.integration
+def test_owner_being_moved_gets_503(client, db_session, auth_headers, test_user, sharded):
+    """
+    Test: Mientras el usuario está marcado como "moviéndose", sus rutas de items responden 503.
+    """
+    db_session.add(models.ShardDirectory(owner_id=test_user.id, shard=None))
+    db_session.commit()
+
+    response = client.get("/items/", headers=auth_headers)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+    # El estado "moviéndose" no se cachea: al terminar el rebalanceo se sirve el shard nuevo
+    db_session.get(models.ShardDirectory, test_user.id).shard = 1 - test_user.id % 2
+    db_session.commit()
+    assert client.get("/items/", headers=auth_headers).status_code == 200
+
+@pytest.mark.integration
+def test_id_allocator_on_async_engine(tmp_path):
+    """
+    Test: Con DB_ASYNC los bloques se reservan con el driver asíncrono dentro de run_sync.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    allocator = sharding.IdAllocator(block_size=2, engine=lambda: engine.sync_engine)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[models.ItemIdCounter.__table__])
+        ids = await asyncio.gather(*(greenlet_spawn(allocator.allocate, 3) for _ in range(4)))
+        await engine.dispose()
+        return ids
+
+    ids = [item_id for block in asyncio.run(scenario()) for item_id in block]
+    assert len(ids) == len(set(ids)) == 12
@@ -0,0 +1,64 @@
+# test/test_startup.py
+import pytest
+from app import importtime
+from app.config import Settings
+
+@pytest.mark.unit
+def test_settings_from_env():
+    """
+    Test: Settings lee cada campo de su variable en mayúsculas, con tipos y los RATE_LIMIT_* aparte.
+    """
+    settings = Settings.from_env({
+        "DATABASE_URL": "sqlite:///./x.db",
+        "DB_POOL_SIZE": "12",
+        "DB_ASYNC": "true",
+        "FAST_JSON": "0",
+        "RATE_LIMIT_ENABLED": "false",
+        "RATE_LIMIT_SEARCH": "50/s",
+        "OTRA_VARIABLE": "ignorada",
+    })
+    assert settings.database_url == "sqlite:///./x.db"
+    assert settings.db_pool_size == 12
+    assert settings.db_async is True
+    assert settings.fast_json is False
+    assert settings.rate_limit_enabled is False
+    assert settings.rate_limits == {"search": "50/s"}
+    # Defectos
+    assert settings.algorithm == "HS256"
+    assert settings.access_token_expire_minutes == 30
+
+@pytest.mark.unit
+def test_importtime_parse_and_report():
+    """
+    Test: El parser de -X importtime respeta la anidación y agrupa por paquete.
+    """
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 | _io",
+        "import time:        50 |         50 |     jose.constants",
+        "import time:       200 |        250 |   jose",
+        "import time:       300 |        550 | app.auth",
+        "otra línea de stderr",
+    ])
+    entries = importtime.parse(stderr)
+    assert [(e.name, e.depth) for e in entries] == [
+        ("_io", 0), ("jose.constants", 2), ("jose", 1), ("app.auth", 0)
+    ]
+
+    data = importtime.report(entries, top=2)
+    assert data["total_ms"] == 0.65
+    assert data["modules"] == 4
+    assert data["packages"] == [
+        {"name": "app", "modules": 1, "ms": 0.3},
+        {"name": "jose", "modules": 2, "ms": 0.25},
+    ]
+    assert data["heavy_loaded"] == ["jose"]
+
+@pytest.mark.integration
+def test_import_app_defers_crypto_and_drivers():
+    """
+    Test: Importar la app (incluso con URL de PostgreSQL) no carga jose, bcrypt ni el driver.
+    """
+    entries = importtime.measure(env={"DATABASE_URL": "postgresql://u:p@localhost/db"})
+    assert importtime.report(entries)["heavy_loaded"] == []
+    assert any(entry.name == "app.main" for entry in entries)
@@ -1,5 +1,6 @@
 # tests/test_users.py
 import pytest
+from app import models
 
 @pytest.mark.integration
 def test_register_user_success(client):
@@ -114,4 +115,56 @@ def test_login_nonexistent_user(client):
         }
     )
     
-    assert response.status_code == 400
\ No newline at end of file
+    assert response.status_code == 400
+
+@pytest.mark.integration
+def test_current_user_is_cached(client, auth_headers):
+    """
+    Test: La segunda petición autenticada no consulta la tabla users.
+    """
+    from app.routes.users import user_cache
+
+    client.get("/items/", headers=auth_headers)
+    client.get("/items/", headers=auth_headers)
+
+    stats = client.get("/stats").json()["user_cache"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats == {**user_cache.stats(), "size": 1}
+
+@pytest.mark.integration
+def test_deactivated_user_is_rejected(client, auth_headers, db_session, test_user):
+    """
+    Test: Desactivar un usuario invalida su entrada en caché.
+    """
+    assert client.get("/items/", headers=auth_headers).status_code == 200
+
+    user = db_session.get(models.User, test_user.id)
+    user.is_active = False
+    db_session.commit()
+
+    response = client.get("/items/", headers=auth_headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Usuario inactivo"
+
+@pytest.mark.integration
+def test_login_returns_503_when_hashing_pool_saturated(client, test_user, monkeypatch):
+    """
+    Test: Si el pool de bcrypt está lleno, el login responde 503 con Retry-After.
+    """
+    from app import auth
+
+    async def saturated(*args, **kwargs):
+        raise auth.HashingPoolSaturated()
+    monkeypatch.setattr(auth.hashing_pool, "run", saturated)
+
+    response = client.post(
+        "/users/login",
+        data={
+            "username": "testuser@example.com",
+            "password": "testpassword123"
+        }
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"